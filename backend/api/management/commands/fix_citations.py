@@ -49,7 +49,8 @@ class Command(BaseCommand):
                 chunks = processor.load_single_document(
                     doc.file_path, 
                     user_id=doc.user.id if doc.user else None,
-                    original_filename=doc.original_filename
+                    original_filename=doc.original_filename,
+                    skip_if_indexed=False
                 )
                 
                 if not chunks:
@@ -164,6 +164,7 @@ class ChatRequestSerializer(serializers.Serializer):
     
     message = serializers.CharField(max_length=10000)
     session_id = serializers.IntegerField(required=False, allow_null=True)
+    stream = serializers.BooleanField(required=False, default=False)
 
 
 class ChatResponseSerializer(serializers.Serializer):
@@ -17,7 +17,7 @@ from django.utils import timezone
 from pathlib import Path
 
 from .models import Document
-from rag.service import DocumentProcessor, VectorStoreManager
+from rag.service import DocumentProcessor, VectorStoreManager, invalidate_indexed_files
 
 
 @shared_task(bind=True, max_retries=3)
@@ -59,6 +59,7 @@ def index_document_task(self, document_id: int):
         document.indexed_at = timezone.now()
         document.error_message = None
         document.save()
+        invalidate_indexed_files(user_id)
         
         return {
             'success': True,
@@ -16,17 +16,18 @@ Frontend Request -> View Function -> Serializer (Validation) -> Models/RAG Servi
 
 import uuid
 import os
+import json
 from pathlib import Path
 from django.conf import settings
 from django.utils import timezone
-from django.http import FileResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.contrib.auth.models import User
 from rest_framework import status, viewsets, generics, permissions
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import Document, ChatSession, ChatMessage, SystemPrompt
-from rag.service import RAGEngine, DocumentProcessor, VectorStoreManager
+from rag.service import RAGEngine, DocumentProcessor, VectorStoreManager, invalidate_indexed_files
 from .serializers import (
     DocumentSerializer, DocumentUploadSerializer,
     ChatSessionSerializer, ChatSessionListSerializer,
@@ -128,6 +129,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 document.chunk_count = len(chunks)
                 document.indexed_at = timezone.now()
                 document.save()
+                invalidate_indexed_files(request.user.id)
                 print(f"✅ Synchronous indexing successful for {document.original_filename}")
             except Exception as sync_error:
                 print(f"❌ Synchronous indexing failed for {document.original_filename}: {sync_error}")
@@ -186,6 +188,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
             
             # Delete DB records
             documents.delete()
+            invalidate_indexed_files(request.user.id)
             
             return Response({'message': 'Knowledge base reset successfully'})
         except Exception as e:
@@ -214,7 +217,9 @@ class DocumentViewSet(viewsets.ModelViewSet):
             print(f"⚠️ Non-critical error during file/vector deletion for {doc_filename}: {e}")
             # We continue anyway to super().destroy() to remove the DB record
             
-        return super().destroy(request, *args, **kwargs)
+        response = super().destroy(request, *args, **kwargs)
+        invalidate_indexed_files(request.user.id)
+        return response
 
 
 from django.db.models import Count, Prefetch
@@ -277,6 +282,8 @@ def chat(request):
     3. If YES: Run RAGEngine (Semantic Search -> LLM).
     4. If NO: Use General Chat (LLM only).
     5. Save User Q and Assistant A to Postgres history.
+    
+    Send `"stream": true` to receive the answer as NDJSON events while it is generated.
     """
     serializer = ChatRequestSerializer(data=request.data)
     if not serializer.is_valid():
@@ -284,6 +291,7 @@ def chat(request):
     
     message = serializer.validated_data['message']
     session_id = serializer.validated_data.get('session_id')
+    stream = serializer.validated_data.get('stream', False)
     
     # Get or Create Session
     if session_id:
@@ -335,17 +343,24 @@ def chat(request):
 
         if message.lower().startswith('search') or message.lower().startswith('web search'):
             # Trigger safe web search
-            result = engine.web_search_query(message, chat_history=chat_history)
+            result = engine.web_search_query(message, chat_history=chat_history, stream=stream)
         elif has_indexed:
             # Standard RAG Query (Retrieval Augmented Generation)
-            result = engine.query(message, chat_history=chat_history)
+            result = engine.query(message, chat_history=chat_history, stream=stream)
         else:
             # Fallback to General Chat (No documents found)
-            result = engine.general_query(message, chat_history=chat_history)
+            result = engine.general_query(message, chat_history=chat_history, stream=stream)
             
             # Subtly notify user if their docs are still being processed
             if has_pending:
-                result['response'] = f"*Note: Your documents are currently being processed.*\n\n{result['response']}"
+                note = "*Note: Your documents are currently being processed.*\n\n"
+                if 'response_stream' in result:
+                    result['response_stream'] = _prepend(note, result['response_stream'])
+                else:
+                    result['response'] = f"{note}{result['response']}"
+        
+        if 'response_stream' in result:
+            return _stream_chat_response(session, message, result)
                 
         response_text = result['response']
         citations = result['citations']
@@ -361,6 +376,20 @@ def chat(request):
         suggested_action = None
         suggestions = []
 
+    _save_assistant_reply(session, message, response_text, citations)
+    
+    return Response({
+        'response': response_text,
+        'citations': citations,
+        'steps': steps, # Send thinking steps to frontend
+        'session_id': session.id,
+        'suggested_action': suggested_action,
+        'suggestions': suggestions
+    })
+
+
+def _save_assistant_reply(session, message, response_text, citations):
+    """Persist the assistant answer and keep the session title/timestamp fresh."""
     # Save LLM response to DB
     ChatMessage.objects.create(
         session=session,
@@ -377,15 +406,53 @@ def chat(request):
         # Update timestamp for sorting
         session.updated_at = timezone.now()
         session.save()
+
+
+def _prepend(text, token_stream):
+    """Yield `text` ahead of an LLM token stream."""
+    yield text
+    yield from token_stream
+
+
+def _stream_chat_response(session, message, result):
+    """
+    Stream the answer as newline-delimited JSON events:
+    `meta` (citations/steps up front), one `token` per LLM chunk, then `done`.
+    The full answer is saved to history once the stream completes.
+    """
+    citations = result['citations']
     
-    return Response({
-        'response': response_text,
-        'citations': citations,
-        'steps': steps, # Send thinking steps to frontend
-        'session_id': session.id,
-        'suggested_action': suggested_action,
-        'suggestions': suggestions
-    })
+    def events():
+        yield json.dumps({
+            'type': 'meta',
+            'session_id': session.id,
+            'citations': citations,
+            'steps': result.get('steps', []),
+            'suggested_action': result.get('suggested_action'),
+        }) + "\n"
+        
+        parts = []
+        try:
+            for token in result['response_stream']:
+                parts.append(token)
+                yield json.dumps({'type': 'token', 'content': token}) + "\n"
+        except Exception as e:
+            # Fallback for errors mid-generation (e.g. Ollama dropped the connection)
+            error_text = f"I encountered an error: {str(e)}"
+            parts.append(error_text)
+            yield json.dumps({'type': 'token', 'content': error_text}) + "\n"
+        
+        _save_assistant_reply(session, message, "".join(parts), citations)
+        yield json.dumps({
+            'type': 'done',
+            'session_id': session.id,
+            'suggestions': result.get('suggestions', []),
+        }) + "\n"
+    
+    response = StreamingHttpResponse(events(), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering so tokens arrive as generated
+    return response
 
 
 @api_view(['GET'])
@@ -185,20 +185,41 @@ GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
 GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.3-70b-versatile')
 
 # Embedding Configuration
-EMBEDDING_PROVIDER = os.environ.get('EMBEDDING_PROVIDER', 'ollama').lower() # 'ollama' or 'openai' or 'huggingface'
+EMBEDDING_PROVIDER = os.environ.get('EMBEDDING_PROVIDER', 'ollama').lower() # 'ollama' or 'openai' or 'huggingface' or 'onnx' (int8 nomic-embed-text in-process)
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 HUGGINGFACE_API_KEY = os.environ.get('HUGGINGFACE_API_KEY', '') # For HF Inference API
+# Quantized ONNX export used by the local 'huggingface' provider (empty = plain PyTorch fp32)
+# e.g. 'onnx/model_quint8_avx2.onnx' on CPUs without AVX-512 VNNI
+HF_EMBEDDING_ONNX_FILE = os.environ.get('HF_EMBEDDING_ONNX_FILE', 'onnx/model_qint8_avx512_vnni.onnx')
 
 # Ollama Connection (Where Llama 3 lives)
 OLLAMA_HOST = os.environ.get('OLLAMA_HOST', 'http://localhost:11434')
 LLM_MODEL = 'llama3.1:8b'
 EMBEDDING_MODEL = 'nomic-embed-text'
+# Truncate nomic-embed-text vectors to this many dimensions (Matryoshka: 512/256/128; 0 = all 768).
+# Recorded on the Chroma collection: changing it applies after a reset + re-index
+EMBEDDING_DIMENSIONS = int(os.environ.get('EMBEDDING_DIMENSIONS', '0'))
 
 
 # Local Storage Paths
 DATA_DIR = BASE_DIR / 'data'          # Raw PDF/TXT file storage
 CHROMA_DIR = BASE_DIR / 'chroma_db'   # Vector database storage (Index)
 
+# Retrieval Tuning
+# Small-to-big retrieval: embed 200-char child chunks, answer from their 1600-char parents.
+# Changes how files are chunked: re-index existing documents after enabling it
+PARENT_CHILD_CHUNKING = os.environ.get('PARENT_CHILD_CHUNKING', 'False').lower() in ('true', '1', 'yes')
+# Serve cached answers to near-identical first-turn questions (cosine >= 0.93, 1h TTL).
+# Costs one document-count query per question to detect uploads/deletes from any process
+SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', 'False').lower() in ('true', '1', 'yes')
+# "binary" (1-bit shortlist + int8 rerank) or "int8" (int8 scan + fp32 rerank): search compressed
+# vector copies kept beside Chroma (re-index existing files after enabling)
+VECTOR_QUANTIZATION = os.environ.get('VECTOR_QUANTIZATION', '')
+# Compress retrieved context with LLMLingua-2 before generation (needs `pip install llmlingua`)
+CONTEXT_COMPRESSION = os.environ.get('CONTEXT_COMPRESSION', 'False').lower() in ('true', '1', 'yes')
+# Retrieve 30 chunks and keep the 5 a small cross-encoder (ms-marco-MiniLM-L4-v2) ranks highest
+RERANKING = os.environ.get('RERANKING', 'False').lower() in ('true', '1', 'yes')
+
 # File Upload Limits
 MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
 ALLOWED_UPLOAD_EXTENSIONS = ['.pdf', '.txt', '.md']
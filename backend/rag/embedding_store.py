@@ -0,0 +1,112 @@
+"""
+Embedding Store - Content-Hash Cache of Chunk Vectors.
+
+Re-ingesting a file that changed in one place would otherwise re-embed every
+chunk in it. `CacheBackedEmbeddings` looks each chunk up in this store first
+and only sends cache misses to the embedding model.
+
+Vectors are keyed by (model namespace, SHA-256 of the chunk text) and stored
+as float16 bytes in one sidecar SQLite file next to the vector index: half
+the size of float32, a fraction of a JSON file per chunk, and one indexed
+lookup per batch instead of one file open per chunk.
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.stores import BaseStore
+
+# Stay well below SQLite's bound-parameter limit
+_MAX_PARAMS = 500
+
+
+class EmbeddingStore(BaseStore[str, List[float]]):
+    """
+    SQLite-backed `BaseStore` mapping chunk text -> embedding for one model.
+
+    Args:
+        db_path: SQLite file shared by every model.
+        namespace: Provider/model tag; vectors from different models never mix.
+    """
+
+    def __init__(self, db_path: str, namespace: str):
+        self.db_path = Path(db_path)
+        self.namespace = namespace
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "namespace TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (namespace, text_hash))"
+        )
+        return conn
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors for the given texts (None for misses)."""
+        hashes = [self._hash(text) for text in keys]
+        found = {}
+        conn = self._connect()
+        try:
+            for start in range(0, len(hashes), _MAX_PARAMS):
+                batch = hashes[start:start + _MAX_PARAMS]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE namespace = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [self.namespace, *batch]
+                ).fetchall()
+                found.update(rows)
+        finally:
+            conn.close()
+        return [
+            np.frombuffer(found[h], dtype=np.float16).astype(np.float32).tolist() if h in found else None
+            for h in hashes
+        ]
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, List[float]]]) -> None:
+        """Store vectors for the given texts."""
+        rows = [
+            (self.namespace, self._hash(text), np.asarray(vector, dtype=np.float16).tobytes())
+            for text, vector in key_value_pairs
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        """Forget the vectors for the given texts."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "DELETE FROM embeddings WHERE namespace = ? AND text_hash = ?",
+                    [(self.namespace, self._hash(text)) for text in keys]
+                )
+        finally:
+            conn.close()
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        """Text hashes stored for this model (texts themselves aren't kept)."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT text_hash FROM embeddings WHERE namespace = ? AND text_hash LIKE ?",
+                (self.namespace, f"{prefix or ''}%")
+            ).fetchall()
+        finally:
+            conn.close()
+        for (text_hash,) in rows:
+            yield text_hash
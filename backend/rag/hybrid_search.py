@@ -16,8 +16,13 @@ COMPONENTS:
 - `HybridRetriever`: A LangChain-compatible retriever that orchestrates the fusion.
 """
 
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
-from collections import defaultdict
+from collections import Counter, defaultdict
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.callbacks import CallbackManagerForRetrieverRun
@@ -37,6 +42,62 @@ def is_bm25_available() -> bool:
     return BM25_AVAILABLE
 
 
+if BM25_AVAILABLE:
+    class IncrementalBM25Okapi(BM25Okapi):
+        """
+        BM25Okapi that can absorb new documents in place.
+        
+        The stock class only builds from a full corpus, so every upload used to
+        re-tokenize and re-count everything indexed so far (O(N^2) over a session).
+        Here term counts are kept cumulatively and idf is recomputed lazily on the
+        next query. Scores are identical to a fresh BM25Okapi over the same corpus.
+        """
+        
+        def _initialize(self, corpus):
+            self.nd: Dict[str, int] = {}  # word -> number of documents with word
+            self.total_len = 0
+            self.add(corpus)
+            return self.nd
+        
+        def add(self, tokenized_docs: List[List[str]]) -> None:
+            """Add already-tokenized documents; only the new ones are counted."""
+            for document in tokenized_docs:
+                frequencies = dict(Counter(document))
+                self.doc_freqs.append(frequencies)
+                self.doc_len.append(len(document))
+                self.total_len += len(document)
+                for word in frequencies:
+                    self.nd[word] = self.nd.get(word, 0) + 1
+                self.corpus_size += 1
+            
+            self.avgdl = self.total_len / self.corpus_size if self.corpus_size else 0
+            self._idf_stale = True
+        
+        def remove(self, keep: List[bool]) -> None:
+            """Drop the documents whose `keep` flag is False, uncounting their terms."""
+            for frequencies, length, kept in zip(self.doc_freqs, self.doc_len, keep):
+                if kept:
+                    continue
+                self.total_len -= length
+                self.corpus_size -= 1
+                for word in frequencies:
+                    self.nd[word] -= 1
+                    if not self.nd[word]:
+                        del self.nd[word]
+            self.doc_freqs = [f for f, kept in zip(self.doc_freqs, keep) if kept]
+            self.doc_len = [n for n, kept in zip(self.doc_len, keep) if kept]
+            
+            self.avgdl = self.total_len / self.corpus_size if self.corpus_size else 0
+            self._idf_stale = True
+        
+        def get_scores(self, query):
+            if self._idf_stale:
+                self.idf = {}
+                self._calc_idf(self.nd)
+                self._idf_stale = False
+            return super().get_scores(query)
+
+
 def tokenize(text: str) -> List[str]:
     """
     Simple tokenizer for BM25.
@@ -63,7 +124,6 @@ class BM25Index:
             documents: Optional list of LangChain Documents to index
         """
         self.documents: List[Document] = []
-        self.tokenized_corpus: List[List[str]] = []
         self.bm25: Optional[BM25Okapi] = None
         
         if documents:
@@ -80,15 +140,43 @@ class BM25Index:
             print("Warning: BM25 not available, skipping index update")
             return
         
-        for doc in documents:
-            self.documents.append(doc)
-            tokens = tokenize(doc.page_content)
-            self.tokenized_corpus.append(tokens)
+        # Only the new documents are tokenized; existing term counts are kept
+        tokenized = [tokenize(doc.page_content) for doc in documents]
+        if not tokenized:
+            return
+        self.documents.extend(documents)
         
-        # Rebuild BM25 index
-        if self.tokenized_corpus:
-            self.bm25 = BM25Okapi(self.tokenized_corpus)
-            print(f"BM25 index updated: {len(self.documents)} documents")
+        if self.bm25 is None:
+            self.bm25 = IncrementalBM25Okapi(tokenized)
+        else:
+            self.bm25.add(tokenized)
+        print(f"BM25 index updated: {len(self.documents)} documents")
+    
+    def remove_file(self, file_path: str) -> bool:
+        """
+        Drop every chunk of a file (matched by `file_path`, or `source` for legacy chunks).
+        
+        Returns:
+            True if anything was removed
+        """
+        keep = [
+            file_path not in (doc.metadata.get('file_path'), doc.metadata.get('source'))
+            for doc in self.documents
+        ]
+        if all(keep):
+            return False
+        if not any(keep):
+            self.clear()
+            return True
+        self.documents = [doc for doc, kept in zip(self.documents, keep) if kept]
+        self.bm25.remove(keep)
+        return True
+    
+    def rebuild(self) -> None:
+        """Re-tokenize and rebuild the whole index from the stored documents."""
+        documents = self.documents
+        self.clear()
+        self.add_documents(documents)
     
     def search(self, query: str, k: int = 10) -> List[tuple]:
         """
@@ -116,8 +204,30 @@ class BM25Index:
     def clear(self) -> None:
         """Clear the index."""
         self.documents = []
-        self.tokenized_corpus = []
         self.bm25 = None
+    
+    def save(self, path: Path) -> None:
+        """Persist the index (documents + term statistics) atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({'documents': self.documents, 'bm25': self.bm25}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """Load an index written by `save`."""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls()
+        index.documents = state['documents']
+        index.bm25 = state['bm25']
+        return index
 
 
 class HybridRetriever(BaseRetriever):
@@ -134,6 +244,7 @@ class HybridRetriever(BaseRetriever):
     semantic_weight: float = 0.6
     bm25_weight: float = 0.4
     rrf_k: int = 60
+    k: int = 5  # Number of fused documents to return
     
     class Config:
         arbitrary_types_allowed = True
@@ -181,7 +292,7 @@ class HybridRetriever(BaseRetriever):
         """
         Required method for BaseRetriever - retrieves documents using hybrid search.
         """
-        k = 5  # Default number of documents
+        k = self.k
         fetch_k = k * 2
         
         # Semantic search
@@ -204,12 +315,33 @@ class HybridRetriever(BaseRetriever):
 
 # Global BM25 index cache (per user)
 _BM25_INDEXES: Dict[int, BM25Index] = {}
+_BM25_MTIMES: Dict[int, float] = {}  # mtime of the sidecar file each cached index was loaded from
+_BM25_LOCK = threading.RLock()
+
+# Where per-user indexes are persisted (None = in-memory only)
+_BM25_PERSIST_DIR: Optional[str] = None
+
+
+def set_bm25_persist_dir(directory: Optional[str]) -> None:
+    """Enable on-disk persistence of per-user BM25 indexes under `directory`."""
+    global _BM25_PERSIST_DIR
+    _BM25_PERSIST_DIR = directory
+
+
+def _bm25_index_path(key: int) -> Optional[Path]:
+    if not _BM25_PERSIST_DIR:
+        return None
+    return Path(_BM25_PERSIST_DIR) / f"bm25_user_{key}.pkl"
 
 
 def get_bm25_index(user_id: int = None) -> BM25Index:
     """
     Get or create BM25 index for a user.
     
+    With persistence enabled, the index is (re)loaded from disk whenever the
+    sidecar file is newer than the cached copy, e.g. after a Celery worker
+    indexed a new upload.
+    
     Args:
         user_id: User ID for index isolation
     
@@ -217,28 +349,94 @@ def get_bm25_index(user_id: int = None) -> BM25Index:
         BM25Index instance
     """
     key = user_id or 0
-    if key not in _BM25_INDEXES:
-        _BM25_INDEXES[key] = BM25Index()
-    return _BM25_INDEXES[key]
+    with _BM25_LOCK:
+        path = _bm25_index_path(key)
+        if path is not None and path.exists():
+            mtime = path.stat().st_mtime
+            if key not in _BM25_INDEXES or _BM25_MTIMES.get(key, 0) < mtime:
+                try:
+                    _BM25_INDEXES[key] = BM25Index.load(path)
+                    _BM25_MTIMES[key] = mtime
+                except Exception as e:
+                    print(f"Warning: could not load BM25 index from {path}: {e}")
+        elif path is not None and key in _BM25_MTIMES:
+            # Loaded from disk earlier, deleted since (e.g. a reset in another process)
+            _BM25_INDEXES.pop(key, None)
+            _BM25_MTIMES.pop(key, None)
+        if key not in _BM25_INDEXES:
+            _BM25_INDEXES[key] = BM25Index()
+        return _BM25_INDEXES[key]
 
 
-def update_bm25_index(documents: List[Document], user_id: int = None) -> None:
+def update_bm25_index(documents: List[Document], user_id: int = None, incremental: bool = True) -> None:
     """
     Update the BM25 index with new documents.
     
     Args:
         documents: Documents to add
         user_id: User ID for index isolation
+        incremental: Only tokenize/count the new documents (False rebuilds
+                     the whole index from scratch)
     """
-    index = get_bm25_index(user_id)
-    index.add_documents(documents)
+    key = user_id or 0
+    with _BM25_LOCK:
+        index = get_bm25_index(user_id)
+        index.add_documents(documents)
+        if not incremental:
+            index.rebuild()
+        
+        path = _bm25_index_path(key)
+        if path is not None:
+            try:
+                index.save(path)
+                _BM25_MTIMES[key] = path.stat().st_mtime
+            except Exception as e:
+                print(f"Warning: could not persist BM25 index to {path}: {e}")
+
+
+def remove_from_bm25_index(file_path: str, user_id: int = None) -> None:
+    """Drop a file's chunks from a user's BM25 index and persist it."""
+    key = user_id or 0
+    with _BM25_LOCK:
+        index = get_bm25_index(user_id)
+        if not index.remove_file(file_path):
+            return
+        path = _bm25_index_path(key)
+        if path is not None:
+            try:
+                index.save(path)
+                _BM25_MTIMES[key] = path.stat().st_mtime
+            except Exception as e:
+                print(f"Warning: could not persist BM25 index to {path}: {e}")
+
+
+def delete_bm25_index(user_id: int = None) -> None:
+    """Drop a user's BM25 index from memory and disk."""
+    key = user_id or 0
+    with _BM25_LOCK:
+        _BM25_INDEXES.pop(key, None)
+        _BM25_MTIMES.pop(key, None)
+        path = _bm25_index_path(key)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+
+def delete_all_bm25_indexes() -> None:
+    """Drop every user's BM25 index from memory and disk."""
+    with _BM25_LOCK:
+        _BM25_INDEXES.clear()
+        _BM25_MTIMES.clear()
+        if _BM25_PERSIST_DIR:
+            for path in Path(_BM25_PERSIST_DIR).glob("bm25_user_*.pkl"):
+                path.unlink(missing_ok=True)
 
 
 def create_hybrid_retriever(
     vector_retriever,
     user_id: int = None,
     semantic_weight: float = 0.6,
-    bm25_weight: float = 0.4
+    bm25_weight: float = 0.4,
+    k: int = 5
 ) -> HybridRetriever:
     """
     Create a hybrid retriever combining vector search and BM25.
@@ -248,6 +446,7 @@ def create_hybrid_retriever(
         user_id: User ID for BM25 index isolation
         semantic_weight: Weight for semantic results
         bm25_weight: Weight for BM25 results
+        k: Number of fused documents to return
     
     Returns:
         HybridRetriever instance
@@ -257,5 +456,6 @@ def create_hybrid_retriever(
         vector_retriever=vector_retriever,
         bm25_index=bm25_index,
         semantic_weight=semantic_weight,
-        bm25_weight=bm25_weight
+        bm25_weight=bm25_weight,
+        k=k
     )
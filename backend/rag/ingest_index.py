@@ -0,0 +1,92 @@
+"""
+Ingest Index - Skip Re-embedding Unchanged Files.
+
+Re-uploading a file KnowBot has already indexed would otherwise re-read,
+re-OCR, re-split and re-embed every page just to add duplicate vectors.
+
+This module records a SHA-256 of every successfully indexed file per user in
+a sidecar SQLite file next to the vector index. `DocumentProcessor` checks it
+before doing any work; `VectorStoreManager` records a file once its vectors
+are written and forgets it again when they are deleted.
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of the file's bytes, streamed so large PDFs aren't read into memory."""
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+class IngestIndex:
+    """
+    SQLite-backed lookup table: (user_id, file_hash) -> the file that was indexed.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        # WAL + NORMAL: commits append to the log instead of fsyncing the main file,
+        # and readers (web workers) don't block the Celery writer
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_index ("
+            "user_id TEXT NOT NULL, file_hash TEXT NOT NULL, file_path TEXT, source TEXT, "
+            "PRIMARY KEY (user_id, file_hash))"
+        )
+        return conn
+
+    def lookup(self, user_id, file_hash: str) -> Optional[dict]:
+        """Return the indexed file with this hash for the user, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT file_path, source FROM ingest_index WHERE user_id = ? AND file_hash = ?",
+                (str(user_id), file_hash)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {'file_path': row[0], 'source': row[1]}
+
+    def record(self, user_id, file_hash: str, file_path: str, source: str) -> None:
+        """Mark a file as indexed for the user."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ingest_index VALUES (?, ?, ?, ?)",
+                    (str(user_id), file_hash, file_path, source)
+                )
+        finally:
+            conn.close()
+
+    def delete_for_file(self, file_path: str) -> None:
+        """Forget a file whose vectors were removed."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM ingest_index WHERE file_path = ?", (file_path,))
+        finally:
+            conn.close()
+
+    def delete_for_user(self, user_id=None) -> None:
+        """Forget all files for a user (or everything if no user is given)."""
+        conn = self._connect()
+        try:
+            with conn:
+                if user_id:
+                    conn.execute("DELETE FROM ingest_index WHERE user_id = ?", (str(user_id),))
+                else:
+                    conn.execute("DELETE FROM ingest_index")
+        finally:
+            conn.close()
@@ -15,13 +15,27 @@ DEPENDENCIES:
 - Pytesseract/Pillow: Python wrappers for OCR and Image manipulation.
 """
 
+import hashlib
+import logging
+import multiprocessing
 import os
+import sqlite3
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 
 # ... rest of the file ...
 
+logger = logging.getLogger(__name__)
+
+# Tesseract 4+ spins up an OpenMP pool per call. Combined with our own
+# parallelism (process pools, gunicorn/celery workers) this oversubscribes
+# the CPU badly; ocrmypdf's benchmarks saw 4-6x slowdowns on multi-core hosts.
+# Must be set before Tesseract is first invoked. Export OMP_THREAD_LIMIT
+# yourself to override (e.g. a box dedicated to single-document OCR).
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
 try:
     import pytesseract
     from PIL import Image
@@ -32,12 +46,80 @@ except ImportError:
     OCR_AVAILABLE = False
     print("Warning: OCR libraries not available. Scanned document support disabled.")
 
+# Page-level OCR pool size when the caller doesn't pass one (None = one per core).
+# Workers of an outer per-file pool set this to 1 so pools don't nest.
+_DEFAULT_OCR_WORKERS: Optional[int] = None
+
+
+def set_default_ocr_workers(max_workers: Optional[int]) -> None:
+    """Set the page-level OCR pool size used by this process (None = os.cpu_count())."""
+    global _DEFAULT_OCR_WORKERS
+    _DEFAULT_OCR_WORKERS = max_workers
+
 
 def is_ocr_available() -> bool:
     """Check if OCR dependencies are installed."""
     return OCR_AVAILABLE
 
 
+def _get_ocr_cache_path() -> Path:
+    """Resolve the OCR cache file, stored next to the vector index."""
+    try:
+        from django.conf import settings
+        chroma_dir = getattr(settings, 'CHROMA_DIR', './chroma_db')
+    except Exception:
+        chroma_dir = './chroma_db'
+    return Path(chroma_dir) / 'ocr_cache.sqlite'
+
+
+def _open_ocr_cache() -> sqlite3.Connection:
+    """Open (and lazily create) the OCR result cache."""
+    cache_path = _get_ocr_cache_path()
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(cache_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS ocr_cache (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+    return conn
+
+
+def _image_cache_key(image_path: str, language: str) -> str:
+    """
+    Content hash of the image bytes (plus OCR language).
+    BLAKE2 is fast enough that hashing is bound by the disk read, not the digest.
+    """
+    with open(image_path, 'rb') as f:
+        digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+    return f"{digest}:{language}"
+
+
+def _get_cached_ocr_text(key: str) -> Optional[str]:
+    """Return cached OCR text for a content hash, or None on miss."""
+    try:
+        conn = _open_ocr_cache()
+        try:
+            row = conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+    except Exception as e:
+        logger.warning("OCR cache lookup failed: %s", e)
+        return None
+
+
+def _store_cached_ocr_text(key: str, text: str) -> None:
+    """Persist OCR text for a content hash (best effort)."""
+    try:
+        conn = _open_ocr_cache()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO ocr_cache (key, text) VALUES (?, ?)", (key, text))
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning("OCR cache write failed: %s", e)
+
+
 def get_file_mime_type(file_path: str) -> str:
     """Detect the MIME type of a file."""
     if not OCR_AVAILABLE:
@@ -59,16 +141,29 @@ def get_file_mime_type(file_path: str) -> str:
     return mime.from_file(file_path)
 
 
+def _classify(path: Path) -> str:
+    """
+    Classify a file with a single MIME lookup.
+    
+    Returns:
+        'image', 'pdf' or 'other'
+    """
+    mime_type = get_file_mime_type(str(path))
+    if mime_type.startswith('image/'):
+        return 'image'
+    if mime_type == 'application/pdf':
+        return 'pdf'
+    return 'other'
+
+
 def is_image_file(file_path: str) -> bool:
     """Check if file is an image."""
-    mime_type = get_file_mime_type(file_path)
-    return mime_type.startswith('image/')
+    return _classify(Path(file_path)) == 'image'
 
 
 def is_pdf_file(file_path: str) -> bool:
     """Check if file is a PDF."""
-    mime_type = get_file_mime_type(file_path)
-    return mime_type == 'application/pdf'
+    return _classify(Path(file_path)) == 'pdf'
 
 
 def is_pdf_scanned(file_path: str) -> bool:
@@ -100,6 +195,7 @@ def is_pdf_scanned(file_path: str) -> bool:
 def extract_text_from_image(image_path: str, language: str = 'eng') -> str:
     """
     Extract text from an image file using Tesseract OCR.
+    Results are cached by content hash, so re-uploads skip Tesseract entirely.
     
     Args:
         image_path: Path to the image file
@@ -111,34 +207,62 @@ def extract_text_from_image(image_path: str, language: str = 'eng') -> str:
     if not OCR_AVAILABLE:
         raise RuntimeError("OCR libraries not installed. Install pytesseract and Pillow.")
     
+    cache_key = None
+    try:
+        cache_key = _image_cache_key(image_path, language)
+        cached = _get_cached_ocr_text(cache_key)
+        if cached is not None:
+            logger.debug("OCR cache hit for image: %s", image_path)
+            return cached
+    except OSError as e:
+        logger.warning("OCR cache key failed for %s: %s", image_path, e)
+    
     try:
-        print(f"DEBUG: Starting OCR for image: {image_path}")
+        logger.debug("Starting OCR for image: %s", image_path)
         image = Image.open(image_path)
-        print(f"DEBUG: Image loaded. Format: {image.format}, Size: {image.size}, Mode: {image.mode}")
+        logger.debug("Image loaded. Format: %s, Size: %s, Mode: %s", image.format, image.size, image.mode)
         
         # Convert to RGB if necessary (handles RGBA, grayscale, etc.)
         if image.mode not in ('L', 'RGB'):
             image = image.convert('RGB')
-            print("DEBUG: Converted image to RGB")
+            logger.debug("Converted image to RGB")
         
-        text = pytesseract.image_to_string(image, lang=language)
-        print(f"DEBUG: OCR Extraction complete. Text length: {len(text.strip())}")
-        print(f"DEBUG: First 50 chars: {text.strip()[:50]}")
-        return text.strip()
+        text = pytesseract.image_to_string(image, lang=language).strip()
+        logger.debug("OCR extraction complete. Text length: %d", len(text))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("First 50 chars: %s", text[:50])
+        if cache_key:
+            _store_cached_ocr_text(cache_key, text)
+        return text
     
     except Exception as e:
         raise RuntimeError(f"OCR extraction failed for {image_path}: {e}")
 
 
-def extract_text_from_pdf_ocr(pdf_path: str, language: str = 'eng', dpi: int = 300) -> List[dict]:
+def _ocr_page_image(job: tuple) -> str:
+    """Process-pool worker: OCR one rendered page image from disk."""
+    image_path, language = job
+    with Image.open(image_path) as image:
+        return pytesseract.image_to_string(image, lang=language).strip()
+
+
+def extract_text_from_pdf_ocr(pdf_path: str, language: str = 'eng', dpi: int = 300,
+                              max_workers: Optional[int] = None) -> List[dict]:
     """
     Extract text from a scanned PDF using OCR.
     Converts each page to an image and applies Tesseract.
     
+    Pages are OCR'd in parallel (one Tesseract per core). Pages are rendered
+    to disk and workers receive file paths, so no image data is pickled.
+    Daemonic processes (Celery prefork workers) can't have children, so OCR
+    run from a Celery task is always serial.
+    
     Args:
         pdf_path: Path to the PDF file
         language: Tesseract language code (default: 'eng')
         dpi: Resolution for PDF to image conversion (higher = better but slower)
+        max_workers: OCR processes to use (default: `set_default_ocr_workers`,
+                     else os.cpu_count())
     
     Returns:
         List of dicts with 'page' and 'text' for each page
@@ -146,30 +270,35 @@ def extract_text_from_pdf_ocr(pdf_path: str, language: str = 'eng', dpi: int = 3
     if not OCR_AVAILABLE:
         raise RuntimeError("OCR libraries not installed. Install pytesseract, Pillow, and pdf2image.")
     
-    results = []
-    
     try:
         # Convert PDF pages to images
         with tempfile.TemporaryDirectory() as temp_dir:
-            images = convert_from_path(
+            image_paths = convert_from_path(
                 pdf_path,
                 dpi=dpi,
                 output_folder=temp_dir,
-                fmt='png'
+                fmt='png',
+                thread_count=1,
+                paths_only=True
             )
+            jobs = [(image_path, language) for image_path in image_paths]
+            workers = min(max_workers or _DEFAULT_OCR_WORKERS or os.cpu_count() or 1, len(jobs))
+            if multiprocessing.current_process().daemon:
+                workers = 1
             
-            for page_num, image in enumerate(images, start=1):
-                # Apply OCR to each page image
-                text = pytesseract.image_to_string(image, lang=language)
-                
-                results.append({
-                    'page': page_num,
-                    'text': text.strip()
-                })
-                
-                print(f"OCR processed page {page_num}/{len(images)}")
+            texts = None
+            if workers > 1:
+                try:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        texts = list(executor.map(_ocr_page_image, jobs))
+                except Exception as e:
+                    logger.warning("Parallel OCR unavailable, running serially: %s", e)
+            if texts is None:
+                texts = [_ocr_page_image(job) for job in jobs]
+            
+            logger.debug("OCR processed %d pages with %d workers", len(texts), workers)
         
-        return results
+        return [{'page': page_num, 'text': text} for page_num, text in enumerate(texts, start=1)]
     
     except Exception as e:
         raise RuntimeError(f"PDF OCR extraction failed for {pdf_path}: {e}")
@@ -191,7 +320,9 @@ def process_document_with_ocr(file_path: str, language: str = 'eng') -> List[dic
     if not path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
     
-    if is_image_file(file_path):
+    kind = _classify(path)
+    
+    if kind == 'image':
         # Direct image file
         text = extract_text_from_image(file_path, language)
         return [{
@@ -201,7 +332,7 @@ def process_document_with_ocr(file_path: str, language: str = 'eng') -> List[dic
             'ocr_applied': True
         }]
     
-    elif is_pdf_file(file_path):
+    elif kind == 'pdf':
         if is_pdf_scanned(file_path):
             # Scanned PDF - use OCR
             print(f"Detected scanned PDF: {path.name}, applying OCR...")
@@ -0,0 +1,99 @@
+"""
+Parent Chunk Store - Small-to-Big Retrieval.
+
+KnowBot embeds SMALL "child" chunks (precise matching, cheap to embed) but
+answers from the LARGER "parent" chunk each child was cut from (enough
+surrounding context for the LLM).
+
+Only children live in ChromaDB. Every child carries a `parent_id` in its
+metadata, and this module keeps the parent text in a sidecar SQLite file
+next to the vector index so it can be looked up after retrieval.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+from langchain_core.documents import Document
+
+
+class ParentChunkStore:
+    """
+    SQLite-backed lookup table: parent_id -> parent chunk (text + metadata).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        # WAL + NORMAL: commits append to the log instead of fsyncing the main file,
+        # and readers (web workers) don't block the Celery writer
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS parent_chunks ("
+            "parent_id TEXT PRIMARY KEY, user_id TEXT, file_path TEXT, "
+            "content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        return conn
+
+    def add(self, parents: List[Document]) -> None:
+        """Persist parent chunks (each must have `parent_id` in its metadata)."""
+        rows = [
+            (
+                p.metadata['parent_id'],
+                p.metadata.get('user_id'),
+                p.metadata.get('file_path'),
+                p.page_content,
+                json.dumps(p.metadata),
+            )
+            for p in parents
+        ]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO parent_chunks VALUES (?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+    def get(self, parent_ids: List[str]) -> Dict[str, Document]:
+        """Fetch parent chunks by id. Unknown ids are simply missing from the result."""
+        if not parent_ids:
+            return {}
+        placeholders = ",".join("?" * len(parent_ids))
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT parent_id, content, metadata FROM parent_chunks WHERE parent_id IN ({placeholders})",
+                list(parent_ids)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            parent_id: Document(page_content=content, metadata=json.loads(metadata))
+            for parent_id, content, metadata in rows
+        }
+
+    def delete_for_file(self, file_path: str) -> None:
+        """Remove all parents cut from a given file."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM parent_chunks WHERE file_path = ?", (file_path,))
+        finally:
+            conn.close()
+
+    def delete_for_user(self, user_id=None) -> None:
+        """Remove all parents for a user (or everything if no user is given)."""
+        conn = self._connect()
+        try:
+            with conn:
+                if user_id:
+                    conn.execute("DELETE FROM parent_chunks WHERE user_id = ?", (str(user_id),))
+                else:
+                    conn.execute("DELETE FROM parent_chunks")
+        finally:
+            conn.close()
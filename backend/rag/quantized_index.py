@@ -0,0 +1,259 @@
+"""
+Quantized Vector Index - Binary Shortlist + Int8 Rerank (or Int8 Scan).
+
+nomic-embed-text produces 768 float32 numbers (3 KB) per chunk, and a brute
+force or HNSW search has to stream those bytes through memory for every
+question. This index keeps two compressed copies of each chunk vector in a
+per-user sidecar file next to ChromaDB:
+
+1. Binary codes: one sign bit per dimension after mean-centering (96 bytes,
+   32x smaller). Hamming distance (XOR + popcount) over these picks a wide
+   shortlist very cheaply.
+2. Int8 codes: each dimension scaled into [-127, 127] (768 bytes, 4x smaller).
+   The shortlist is rescored with integer dot products to pick the final k.
+   `search_int8` skips the binary stage and scans all int8 codes instead
+   (better recall, still 4x fewer bytes than fp32).
+
+Chroma stays the source of truth for chunk text and metadata; this index only
+returns chunk ids. The centering mean and int8 scale are calibrated once the
+index holds MIN_CALIBRATION_VECTORS vectors and then frozen, so codes written
+later stay comparable. Until then the few vectors are kept (and searched) in
+float32.
+
+Writers (web + Celery processes) take an exclusive lock on a `.lock` file next
+to the index, so concurrent updates can't overwrite each other's vectors.
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: process-local locking only
+    fcntl = None
+
+# Vectors needed before the centering mean / int8 scale are estimated. Estimated
+# from a single small file they degenerate (e.g. all-zero residuals).
+MIN_CALIBRATION_VECTORS = 256
+
+# Popcount over packed bytes (np.bitwise_count needs NumPy 2.0)
+if hasattr(np, 'bitwise_count'):
+    def _popcount_rows(packed: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(packed).sum(axis=1, dtype=np.int32)
+else:
+    def _popcount_rows(packed: np.ndarray) -> np.ndarray:
+        return np.unpackbits(packed, axis=1).sum(axis=1, dtype=np.int32)
+
+
+class QuantizedIndex:
+    """
+    Binary + int8 compressed copy of one user's chunk vectors.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.file_paths: List[str] = []
+        self.bits = np.empty((0, 0), dtype=np.uint8)
+        self.codes = np.empty((0, 0), dtype=np.int8)
+        self.raw = np.empty((0, 0), dtype=np.float32)  # float32 vectors while uncalibrated
+        self.mean = None   # float32 (dim,) centering vector
+        self.scale = None  # float, int8 quantization scale
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _calibrate(self, vectors: np.ndarray) -> None:
+        self.mean = vectors.mean(axis=0)
+        # Clip the 0.5% tail so a few outliers don't waste the int8 range
+        self.scale = float(127.0 / max(np.percentile(np.abs(vectors - self.mean), 99.5), 1e-6))
+        self.bits = np.empty((0, (vectors.shape[1] + 7) // 8), dtype=np.uint8)
+        self.codes = np.empty((0, vectors.shape[1]), dtype=np.int8)
+
+    def _binarize(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(vectors - self.mean > 0, axis=-1)
+
+    def _to_int8(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.round(vectors * self.scale), -127, 127).astype(np.int8)
+
+    def add(self, ids: List[str], file_paths: List[str], embeddings: List[List[float]]) -> None:
+        """Append chunk vectors (already stored in Chroma under `ids`)."""
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        self.ids.extend(ids)
+        self.file_paths.extend(file_paths)
+        if self.mean is None:
+            self.raw = np.vstack([self.raw, vectors]) if self.raw.size else vectors
+            if len(self.raw) < MIN_CALIBRATION_VECTORS:
+                return
+            self._calibrate(self.raw)
+            vectors, self.raw = self.raw, np.empty((0, 0), dtype=np.float32)
+        self.bits = np.vstack([self.bits, self._binarize(vectors)])
+        self.codes = np.vstack([self.codes, self._to_int8(vectors - self.mean)])
+
+    def remove_file(self, file_path: str) -> None:
+        """Drop every chunk that came from `file_path`."""
+        keep = np.array([fp != file_path for fp in self.file_paths], dtype=bool)
+        if keep.all():
+            return
+        self.ids = [i for i, k in zip(self.ids, keep) if k]
+        self.file_paths = [fp for fp, k in zip(self.file_paths, keep) if k]
+        if self.mean is None:
+            self.raw = self.raw[keep]
+            return
+        self.bits = self.bits[keep]
+        self.codes = self.codes[keep]
+
+    def _search_raw(self, embedding: List[float], k: int) -> List[str]:
+        """Exact squared-L2 scan over the float32 vectors kept before calibration."""
+        distances = np.sum((self.raw - np.asarray(embedding, dtype=np.float32)) ** 2, axis=1)
+        return [self.ids[i] for i in np.argsort(distances)[:k]]
+
+    def search(self, embedding: List[float], k: int = 5, oversample: int = 4) -> List[str]:
+        """
+        Ids of the k best chunks: Hamming top `k * oversample`, then int8 rerank.
+        """
+        if not self.ids:
+            return []
+        if self.mean is None:
+            return self._search_raw(embedding, k)
+        query = np.asarray(embedding, dtype=np.float32)
+
+        # 1. Hamming shortlist over the packed sign bits
+        distances = _popcount_rows(np.bitwise_xor(self.bits, self._binarize(query)))
+        shortlist_size = min(k * oversample, len(self.ids))
+        shortlist = np.argpartition(distances, shortlist_size - 1)[:shortlist_size]
+
+        # 2. Int8 rerank (dot product with the centered codes; ranking-equivalent to fp32)
+        query_codes = self._to_int8(query).astype(np.int32)
+        scores = self.codes[shortlist].astype(np.int32) @ query_codes
+        best = shortlist[np.argsort(-scores)[:k]]
+        return [self.ids[i] for i in best]
+
+    def search_int8(self, embedding: List[float], k: int = 5) -> List[str]:
+        """
+        Ids of the k best chunks by int8 dot product over every stored vector
+        (no binary stage; 4x less memory traffic than an fp32 scan).
+        """
+        if not self.ids:
+            return []
+        if self.mean is None:
+            return self._search_raw(embedding, k)
+        query_codes = self._to_int8(np.asarray(embedding, dtype=np.float32)).astype(np.int32)
+        scores = self.codes.astype(np.int32) @ query_codes
+        k = min(k, len(self.ids))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [self.ids[i] for i in best]
+
+    def save(self, path: Path) -> None:
+        """Persist the index atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    ids=np.array(self.ids, dtype=str),
+                    file_paths=np.array(self.file_paths, dtype=str),
+                    bits=self.bits,
+                    codes=self.codes,
+                    raw=self.raw,
+                    mean=self.mean if self.mean is not None else np.empty(0, dtype=np.float32),
+                    scale=np.float64(self.scale or 0.0),
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> "QuantizedIndex":
+        """Load an index written by `save`."""
+        index = cls()
+        with np.load(path) as data:
+            index.ids = data['ids'].tolist()
+            index.file_paths = data['file_paths'].tolist()
+            index.bits = data['bits']
+            index.codes = data['codes']
+            if 'raw' in data.files:
+                index.raw = data['raw']
+            if data['mean'].size:
+                index.mean = data['mean']
+                index.scale = float(data['scale'])
+        return index
+
+
+# Loaded indexes, refreshed when another process (e.g. a Celery worker) rewrites the file
+_INDEXES: Dict[str, Tuple[float, QuantizedIndex]] = {}
+_LOCK = threading.RLock()
+
+
+def get_quantized_index(path: Path) -> QuantizedIndex:
+    """Get the index stored at `path` (empty if the file doesn't exist yet)."""
+    key = str(path)
+    with _LOCK:
+        mtime = path.stat().st_mtime if path.exists() else 0.0
+        cached = _INDEXES.get(key)
+        if cached is None or cached[0] != mtime:  # Rewritten or deleted elsewhere
+            try:
+                index = QuantizedIndex.load(path) if mtime else QuantizedIndex()
+            except Exception as e:
+                print(f"Warning: could not load quantized index from {path}: {e}")
+                index = QuantizedIndex()
+            cached = _INDEXES[key] = (mtime, index)
+        return cached[1]
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Exclusive cross-process lock for writers of the index at `path`."""
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_for_update(path: Path) -> QuantizedIndex:
+    """Latest on-disk copy (read under the file lock, never the cached one)."""
+    return QuantizedIndex.load(path) if path.exists() else QuantizedIndex()
+
+
+def update_quantized_index(path: Path, ids: List[str], file_paths: List[str], embeddings: List[List[float]]) -> None:
+    """Append vectors to the index at `path` and persist it."""
+    with _LOCK, _file_lock(path):
+        index = _load_for_update(path)
+        index.add(ids, file_paths, embeddings)
+        index.save(path)
+        _INDEXES[str(path)] = (path.stat().st_mtime, index)
+
+
+def remove_from_quantized_index(path: Path, file_path: str) -> None:
+    """Drop a file's vectors from the index at `path`."""
+    with _LOCK, _file_lock(path):
+        if not path.exists():
+            return
+        index = _load_for_update(path)
+        index.remove_file(file_path)
+        index.save(path)
+        _INDEXES[str(path)] = (path.stat().st_mtime, index)
+
+
+def delete_quantized_index(path: Path) -> None:
+    """Drop the index at `path` from memory and disk."""
+    with _LOCK, _file_lock(path):
+        _INDEXES.pop(str(path), None)
+        path.unlink(missing_ok=True)
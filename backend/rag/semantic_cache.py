@@ -0,0 +1,170 @@
+"""
+Semantic Answer Cache - Skip Retrieval + LLM for Repeat Questions.
+
+FAQ-style traffic asks the same thing over and over in slightly different
+words ("what's the refund policy?" / "how do refunds work?"). Answering each
+one costs a vector search plus a full LLM generation.
+
+This cache stores finished answers next to the embedding of the question
+that produced them. A new question whose embedding is close enough (cosine
+similarity >= threshold) to a cached one gets the stored answer back
+instantly.
+
+Entries are grouped into buckets (user, mode, prompt, indexed files...) so a
+cached answer is only ever served to the same user under the same settings.
+
+Embeddings barely separate questions that differ only in a key term ("CPC"
+vs "CPM", "Q3 2023" vs "Q3 2024"), so a hit also requires both questions to
+mention exactly the same capitalized terms and numbers.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+# Capitalized terms / acronyms (3+ chars) and numbers
+_ENTITY_RE = re.compile(r'[A-Z][A-Za-z0-9_-]{2,}|\d+(?:[.,]\d+)*')
+
+
+def extract_entities(question: str) -> frozenset:
+    """The terms a cached answer's question must share with a new question."""
+    entities = set()
+    for match in _ENTITY_RE.finditer(question):
+        term = match.group()
+        before = question[:match.start()].rstrip()
+        # "What"/"How" at the start of a sentence is capitalized by grammar, not an entity
+        if term[1:].islower() and (not before or before[-1] in '.!?'):
+            continue
+        entities.add(term)
+    return frozenset(entities)
+
+
+class _Bucket:
+    """
+    One bucket's entries in fixed slots: row i of `vectors` is the unit question
+    embedding for `questions[i]`, so a lookup is a single matrix-vector product.
+    Storage doubles as entries arrive (up to `max_entries`) so quiet buckets stay small.
+    """
+
+    def __init__(self, max_entries: int, dim: int, initial: int = 8):
+        capacity = min(initial, max_entries)
+        self.max_entries = max_entries
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.questions: List[Optional[str]] = [None] * capacity
+        self.answers: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.entities: List[frozenset] = [frozenset()] * capacity
+        self.slots: Dict[str, int] = {}  # question -> slot
+        self.size = 0
+
+    def _grow(self) -> None:
+        capacity = min(2 * len(self.questions), self.max_entries)
+        extra = capacity - len(self.questions)
+        self.vectors = np.vstack([self.vectors, np.zeros((extra, self.vectors.shape[1]), dtype=np.float32)])
+        self.timestamps = np.concatenate([self.timestamps, np.zeros(extra)])
+        self.last_used = np.concatenate([self.last_used, np.zeros(extra, dtype=np.int64)])
+        self.questions.extend([None] * extra)
+        self.answers.extend([None] * extra)
+        self.entities.extend([frozenset()] * extra)
+
+    def free_slot(self, now: float, ttl_seconds: float) -> int:
+        """Next empty slot, else an expired one, else the least recently used."""
+        if self.size == len(self.questions) < self.max_entries:
+            self._grow()
+        if self.size < len(self.questions):
+            self.size += 1
+            return self.size - 1
+        expired = now - self.timestamps > ttl_seconds
+        slot = int(np.argmax(expired)) if expired.any() else int(np.argmin(self.last_used))
+        del self.slots[self.questions[slot]]
+        return slot
+
+
+class SemanticAnswerCache:
+    """
+    In-memory LRU + TTL cache of answers, looked up by question embedding.
+
+    Args:
+        threshold: Minimum cosine similarity for a hit.
+        ttl_seconds: How long an answer stays valid.
+        max_entries: Answers kept per bucket (least recently used are evicted).
+        max_buckets: Buckets kept overall.
+    """
+
+    def __init__(self, threshold: float = 0.93, ttl_seconds: int = 3600,
+                 max_entries: int = 256, max_buckets: int = 1024):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._clock = 0  # Recency counter for per-slot LRU eviction
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, bucket: Hashable, question: str, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for the most similar question with the same entities, or None."""
+        query = self._normalize(embedding)
+        entities = extract_entities(question)
+        now = time.time()
+        with self._lock:
+            entries = self._buckets.get(bucket)
+            if entries is None or entries.size == 0 or entries.vectors.shape[1] != query.shape[0]:
+                return None
+
+            # One GEMV over the contiguous matrix; expired slots can't win
+            scores = entries.vectors[:entries.size] @ query
+            scores[now - entries.timestamps[:entries.size] > self.ttl_seconds] = -np.inf
+            candidates = np.flatnonzero(scores >= self.threshold)
+            # Lexical guard: a near-paraphrase about a different entity is a miss
+            for slot in candidates[np.argsort(-scores[candidates])]:
+                if entries.entities[slot] == entities:
+                    self._clock += 1
+                    entries.last_used[slot] = self._clock
+                    self._buckets.move_to_end(bucket)
+                    return entries.answers[slot]
+            return None
+
+    def store(self, bucket: Hashable, question: str, embedding: List[float], answer: Dict[str, Any]) -> None:
+        """Cache an answer under its question's embedding."""
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            entries = self._buckets.get(bucket)
+            if entries is None or entries.vectors.shape[1] != vector.shape[0]:
+                entries = self._buckets[bucket] = _Bucket(self.max_entries, vector.shape[0])
+
+            slot = entries.slots.get(question)
+            if slot is None:
+                slot = entries.free_slot(now, self.ttl_seconds)
+                entries.slots[question] = slot
+            self._clock += 1
+            entries.vectors[slot] = vector
+            entries.timestamps[slot] = now
+            entries.last_used[slot] = self._clock
+            entries.questions[slot] = question
+            entries.answers[slot] = answer
+            entries.entities[slot] = extract_entities(question)
+
+            self._buckets.move_to_end(bucket)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+
+    def clear(self, user_id=None) -> None:
+        """Forget cached answers for a user (buckets start with the user id), or everything."""
+        with self._lock:
+            if user_id is None:
+                self._buckets.clear()
+                return
+            for bucket in [b for b in self._buckets if isinstance(b, tuple) and b and b[0] == user_id]:
+                del self._buckets[bucket]
@@ -7,13 +7,29 @@
 3. `RAGEngine` (The Thinking Process):
 """
 
+import asyncio
+import hashlib
+import io
+import multiprocessing
 import os
+import re
+import threading
+import time
+import uuid
+import weakref
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
 
 import chromadb
+import httpx
+import numpy as np
 from langchain_ollama import OllamaEmbeddings, ChatOllama
 from langchain_openai import OpenAIEmbeddings
 from langchain_huggingface import HuggingFaceEmbeddings
@@ -21,14 +37,63 @@ from langchain_groq import ChatGroq
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+
+# Document model for the per-user file list (absent when used outside the Django app)
+try:
+    from api.models import Document
+except Exception:
+    Document = None
+
+# Fast C-backed PDF text extraction (falls back to pure-Python pypdf)
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+    print("Warning: pymupdf not installed. Falling back to PyPDFLoader.")
+
+# Rust-backed text splitter (falls back to the pure-Python recursive splitter)
+try:
+    from semantic_text_splitter import TextSplitter
+    RUST_SPLITTER_AVAILABLE = True
+except ImportError:
+    RUST_SPLITTER_AVAILABLE = False
+
+# Web search (optional; web_search_query falls back to general_query without it)
+try:
+    from tavily import TavilyClient
+    TAVILY_AVAILABLE = True
+except ImportError:
+    TAVILY_AVAILABLE = False
+
+# Persistent embedding cache (moved to langchain_classic in LangChain 1.x)
+try:
+    from langchain.embeddings import CacheBackedEmbeddings
+    EMBEDDING_CACHE_ENABLED = True
+except ImportError:
+    try:
+        from langchain_classic.embeddings import CacheBackedEmbeddings
+        EMBEDDING_CACHE_ENABLED = True
+    except ImportError:
+        EMBEDDING_CACHE_ENABLED = False
+        print("Warning: CacheBackedEmbeddings not available. Embedding cache disabled.")
+
+from rag.embedding_store import EmbeddingStore
+from rag.parent_store import ParentChunkStore
+from rag.ingest_index import IngestIndex, hash_file
+from rag.semantic_cache import SemanticAnswerCache
+from rag.quantized_index import (
+    get_quantized_index, update_quantized_index, remove_from_quantized_index, delete_quantized_index
+)
 
 # OCR support for scanned documents
 try:
-    from rag.ocr import process_document_with_ocr, is_ocr_available, is_image_file
+    from rag.ocr import process_document_with_ocr, is_ocr_available, is_image_file, set_default_ocr_workers
     OCR_ENABLED = is_ocr_available()
 except ImportError:
     OCR_ENABLED = False
@@ -37,7 +102,8 @@ except ImportError:
 # Hybrid search (BM25 + Semantic)
 try:
     from rag.hybrid_search import (
-        is_bm25_available, update_bm25_index, create_hybrid_retriever, get_bm25_index
+        is_bm25_available, update_bm25_index, create_hybrid_retriever, get_bm25_index,
+        set_bm25_persist_dir, delete_bm25_index, delete_all_bm25_indexes, remove_from_bm25_index
     )
     HYBRID_SEARCH_ENABLED = is_bm25_available()
 except ImportError:
@@ -48,6 +114,29 @@ except ImportError:
 # Configuration from Django settings
 CHUNK_SIZE = 800      # Characters per chunk (Context Window optimization)
 CHUNK_OVERLAP = 150   # Overlap ensures context isn't cut mid-sentence
+PARENT_CHILD_CHUNKING = getattr(settings, 'PARENT_CHILD_CHUNKING', False)  # Small-to-big retrieval
+PARENT_CHUNK_SIZE = 1600   # What the LLM reads
+PARENT_CHUNK_OVERLAP = 200
+PARENT_CHUNK_KEY = 'parent_chunk'  # Child metadata carrying its parent Document until indexing (never stored)
+CHILD_CHUNK_SIZE = 200     # What gets embedded and matched
+CHILD_CHUNK_OVERLAP = 40
+MIN_CHUNK_CHARS = 200     # Shorter chunks (headers, OCR noise) get merged into a neighbor
+PARALLEL_SPLIT_THRESHOLD = 32  # Pages before splitting is fanned out across processes
+READAHEAD_FILES = 16  # Files ahead of the parsers whose bytes are prefetched into the page cache
+EMBEDDING_BATCH_SIZE = 64  # Chunks per embed_documents call / Chroma insert during ingestion
+EMBEDDING_WORKERS = 8  # Concurrent embedding requests to a remote embedder (Ollama/OpenAI)
+CHROMA_WRITE_BATCH_SIZE = 5000  # Embedded chunks buffered per Chroma add (one SQLite transaction each)
+QUERY_EMBEDDING_CACHE_SIZE = 2048  # Recent question embeddings kept in memory
+INDEXED_FILES_CACHE_TTL = 60  # Seconds the per-user indexed file list is cached
+PROMPT_CACHE_SIZE = 256  # Compiled RAG prompt templates kept across requests
+CHAIN_CACHE_SIZE = 128  # Built LCEL chains kept by build_rag_chain
+WEB_SEARCH_CACHE_SIZE = 1024  # Recent Tavily results kept in memory
+WEB_SEARCH_CACHE_TTL = 300  # Seconds a web search result is reused
+MAX_CONTEXT_CHARS = 12000  # ~8k-token llama3.1 window minus prompt/answer headroom
+DUPLICATE_CHUNK_JACCARD = 0.8  # Retrieved chunks this similar to an earlier one are left out of the context
+SEMANTIC_CACHE_ENABLED = getattr(settings, 'SEMANTIC_CACHE_ENABLED', False)  # Reuse answers to paraphrased questions
+SEMANTIC_CACHE_THRESHOLD = 0.93  # Cosine similarity needed to reuse a cached answer
+SEMANTIC_CACHE_TTL = 3600  # Seconds a cached answer stays valid
 EMBEDDING_MODEL = getattr(settings, 'EMBEDDING_MODEL', 'nomic-embed-text')
 LLM_MODEL = getattr(settings, 'LLM_MODEL', 'llama3.1:8b')
 CHROMA_DIR = str(getattr(settings, 'CHROMA_DIR', './chroma_db'))
@@ -59,29 +148,533 @@ GROQ_MODEL = getattr(settings, 'GROQ_MODEL', 'llama-3.3-70b-versatile')
 EMBEDDING_PROVIDER = getattr(settings, 'EMBEDDING_PROVIDER', 'ollama')
 OPENAI_API_KEY = getattr(settings, 'OPENAI_API_KEY', '')
 HUGGINGFACE_API_KEY = getattr(settings, 'HUGGINGFACE_API_KEY', '')
+HF_EMBEDDING_ONNX_FILE = getattr(settings, 'HF_EMBEDDING_ONNX_FILE', 'onnx/model_qint8_avx512_vnni.onnx')
+EMBEDDING_DIMENSIONS = getattr(settings, 'EMBEDDING_DIMENSIONS', 0) or None  # Matryoshka truncation (nomic only)
+VECTOR_QUANTIZATION = getattr(settings, 'VECTOR_QUANTIZATION', '') or None  # None, "binary" or "int8"
+INT8_RERANK_FACTOR = 4  # int8 mode: candidates per final result rescored in fp32
+CONTEXT_COMPRESSION = getattr(settings, 'CONTEXT_COMPRESSION', False)  # LLMLingua-2 prompt compression
+CONTEXT_COMPRESSION_MODEL = "microsoft/llmlingua-2-xlm-roberta-large-meetingbank"
+CONTEXT_COMPRESSION_RATE = 0.4  # Fraction of context tokens kept
+CONTEXT_COMPRESSION_MIN_CHARS = 1500  # Shorter contexts aren't worth a compressor pass
+RERANKING = getattr(settings, 'RERANKING', False)  # Cross-encoder rerank of a wider candidate set
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L4-v2"
+RERANK_ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+RERANK_CANDIDATES = 30  # Chunks retrieved for the cross-encoder to score
+RERANK_TOP_K = 5  # Chunks kept for the LLM (prefill cost stays the same as without reranking)
+
+# LLMLingua pulls in torch/transformers, so it is only imported when compression is enabled
+LLMLINGUA_AVAILABLE = False
+if CONTEXT_COMPRESSION:
+    try:
+        from llmlingua import PromptCompressor
+        LLMLINGUA_AVAILABLE = True
+    except ImportError:
+        print("Warning: llmlingua not installed. Context compression disabled.")
+
+# Same for the cross-encoder (sentence-transformers loads torch)
+CROSS_ENCODER_AVAILABLE = False
+if RERANKING:
+    try:
+        from sentence_transformers import CrossEncoder
+        CROSS_ENCODER_AVAILABLE = True
+    except ImportError:
+        print("Warning: sentence-transformers not installed. Reranking disabled.")
+
+# Persist per-user BM25 indexes next to the vector index (shared by web + Celery processes)
+if HYBRID_SEARCH_ENABLED:
+    set_bm25_persist_dir(str(Path(CHROMA_DIR) / "bm25"))
 
-# Global client singleton to prevent file locking/HNSW errors
-_CHROMA_CLIENT = None
+# Global client singletons (one per persist directory / server) to prevent file locking/HNSW errors
+_CHROMA_CLIENTS: Dict[str, Any] = {}
+_CHROMA_LOCK = threading.Lock()
 
 def get_chroma_client(persist_directory: str = None):
     """
     Singleton pattern for ChromaDB client.
     Prevents multiple connections locking the SQLite database file.
+    
+    Clients are keyed by their target (server address or directory), and creation
+    is serialized so concurrent first requests can't open two PersistentClients
+    on the same files.
+    """
+    chroma_host = os.environ.get('CHROMA_HOST')
+    chroma_port = os.environ.get('CHROMA_PORT', '8000')
+    path = persist_directory or CHROMA_DIR
+    key = f"http://{chroma_host}:{chroma_port}" if chroma_host else str(Path(path).resolve())
+    
+    with _CHROMA_LOCK:
+        client = _CHROMA_CLIENTS.get(key)
+        if client is None:
+            if chroma_host:
+                print(f"Connecting to ChromaDB Server at {chroma_host}:{chroma_port}")
+                client = chromadb.HttpClient(host=chroma_host, port=int(chroma_port))
+            else:
+                print(f"Using local PersistentClient at {path}")
+                client = chromadb.PersistentClient(path=path)
+            _CHROMA_CLIENTS[key] = client
+    
+    return client
+
+
+# In-process LRU of question embeddings, keyed by (embedding namespace, text).
+# Module-level so it survives the per-request RAGEngine/VectorStoreManager instances.
+_QUERY_EMBEDDINGS: "OrderedDict[tuple, List[float]]" = OrderedDict()
+_QUERY_EMBEDDINGS_LOCK = threading.Lock()
+
+
+class QueryCachedEmbeddings(Embeddings):
     """
-    global _CHROMA_CLIENT
-    if _CHROMA_CLIENT is None:
-        chroma_host = os.environ.get('CHROMA_HOST')
-        chroma_port = os.environ.get('CHROMA_PORT', '8000')
+    Embeddings wrapper that memoizes `embed_query`.
+    Repeated questions skip the embedding round-trip (~50-300 ms on Ollama).
+    Document embedding is passed straight through.
+    """
+    
+    def __init__(self, underlying: Embeddings, namespace: str):
+        self.underlying = underlying
+        self.namespace = namespace
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        key = (self.namespace, text)
+        with _QUERY_EMBEDDINGS_LOCK:
+            vector = _QUERY_EMBEDDINGS.get(key)
+            if vector is not None:
+                _QUERY_EMBEDDINGS.move_to_end(key)
+                return vector
         
-        if chroma_host:
-            print(f"Connecting to ChromaDB Server at {chroma_host}:{chroma_port}")
-            _CHROMA_CLIENT = chromadb.HttpClient(host=chroma_host, port=int(chroma_port))
-        else:
-            print(f"Using local PersistentClient at {persist_directory}")
-            path = persist_directory or CHROMA_DIR
-            _CHROMA_CLIENT = chromadb.PersistentClient(path=path)
-            
-    return _CHROMA_CLIENT
+        # Embed outside the lock so concurrent questions don't serialize on the model
+        vector = self.underlying.embed_query(text)
+        with _QUERY_EMBEDDINGS_LOCK:
+            _QUERY_EMBEDDINGS[key] = vector
+            _QUERY_EMBEDDINGS.move_to_end(key)
+            while len(_QUERY_EMBEDDINGS) > QUERY_EMBEDDING_CACHE_SIZE:
+                _QUERY_EMBEDDINGS.popitem(last=False)
+        return vector
+
+
+class MatryoshkaEmbeddings(Embeddings):
+    """
+    Truncates nomic-embed-text vectors to their first `dimensions` entries.
+    
+    nomic-embed-text v1.5 is trained with Matryoshka representation learning,
+    so a 256-d prefix keeps nearly all of the retrieval quality of the full 768-d
+    vector at a third of the bytes stored, compared and sent over the wire.
+    Follows the model card: layer norm over the full vector, truncate, L2 normalize.
+    """
+    
+    def __init__(self, underlying: Embeddings, dimensions: int):
+        self.underlying = underlying
+        self.dimensions = dimensions
+    
+    def _truncate(self, vectors: List[List[float]]) -> List[List[float]]:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix = (matrix - matrix.mean(axis=1, keepdims=True)) / np.sqrt(matrix.var(axis=1, keepdims=True) + 1e-5)
+        matrix = matrix[:, :self.dimensions]
+        matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+        return matrix.tolist()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._truncate(self.underlying.embed_documents(texts))
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._truncate([self.underlying.embed_query(text)])[0]
+
+
+def get_parent_store() -> ParentChunkStore:
+    """Sidecar store for parent chunks, kept next to the vector index."""
+    return ParentChunkStore(str(Path(CHROMA_DIR) / "parent_chunks.sqlite"))
+
+
+def get_ingest_index() -> IngestIndex:
+    """Sidecar table of already-indexed file hashes, kept next to the vector index."""
+    return IngestIndex(str(Path(CHROMA_DIR) / "ingest_index.sqlite"))
+
+
+# Ollama client singletons. Each LangChain Ollama object owns an httpx pool, and
+# RAGEngine/VectorStoreManager are rebuilt per request; sharing one instance keeps
+# sockets alive across requests instead of reconnecting (and piling up TIME_WAITs).
+_OLLAMA_CLIENT_KWARGS = {
+    'timeout': 120,
+    'limits': httpx.Limits(max_keepalive_connections=16, max_connections=32),
+}
+# Keep the model (and its prompt KV cache) resident between requests instead of Ollama's 5m default
+OLLAMA_KEEP_ALIVE = "30m"
+_OLLAMA_LLM = None
+_OLLAMA_EMBEDDINGS = None
+_OLLAMA_LOCK = threading.Lock()
+
+def get_ollama_llm() -> ChatOllama:
+    """Shared, connection-pooled ChatOllama (thread-safe HTTP client)."""
+    global _OLLAMA_LLM
+    with _OLLAMA_LOCK:
+        if _OLLAMA_LLM is None:
+            _OLLAMA_LLM = ChatOllama(
+                model=LLM_MODEL,
+                temperature=0.2,
+                base_url=OLLAMA_HOST,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                client_kwargs=_OLLAMA_CLIENT_KWARGS
+            )
+    return _OLLAMA_LLM
+
+
+def get_ollama_embeddings() -> OllamaEmbeddings:
+    """Shared, connection-pooled OllamaEmbeddings (thread-safe HTTP client)."""
+    global _OLLAMA_EMBEDDINGS
+    with _OLLAMA_LOCK:
+        if _OLLAMA_EMBEDDINGS is None:
+            _OLLAMA_EMBEDDINGS = OllamaEmbeddings(
+                model=EMBEDDING_MODEL,
+                base_url=OLLAMA_HOST,
+                client_kwargs=_OLLAMA_CLIENT_KWARGS
+            )
+    return _OLLAMA_EMBEDDINGS
+
+
+_ONNX_EMBEDDINGS = None
+_ONNX_FAILED = False  # Don't retry a failed load on every request
+
+def get_onnx_embeddings():
+    """
+    Shared in-process quantized nomic-embed-text (the model is loaded once per process).
+    Returns None if onnxruntime/optimum aren't installed or the model can't be loaded
+    (e.g. no network to fetch it). They are imported here rather than at module level
+    so processes using other providers never load them.
+    """
+    global _ONNX_EMBEDDINGS, _ONNX_FAILED
+    with _OLLAMA_LOCK:
+        if _ONNX_EMBEDDINGS is None and not _ONNX_FAILED:
+            try:
+                from rag.onnx_embeddings import QuantizedNomicEmbeddings
+                _ONNX_EMBEDDINGS = QuantizedNomicEmbeddings(
+                    cache_dir=str(Path(CHROMA_DIR) / "onnx"),
+                    batch_size=EMBEDDING_BATCH_SIZE,
+                )
+                print("Using quantized ONNX nomic-embed-text (Local/In-process)")
+            except Exception as e:
+                _ONNX_FAILED = True
+                print(f"Warning: ONNX embeddings unavailable ({e}). Falling back to Ollama.")
+    return _ONNX_EMBEDDINGS
+
+
+def _indexed_files_cache_key(user_id) -> str:
+    return f"indexed_files:{user_id}"
+
+
+def get_indexed_files(user_id) -> List[str]:
+    """
+    Fetch list of indexed filenames for the user.
+    Cached for INDEXED_FILES_CACHE_TTL seconds so each question doesn't cost a DB query.
+    """
+    key = _indexed_files_cache_key(user_id)
+    try:
+        files = cache.get(key)
+        if files is not None:
+            return files
+    except Exception:
+        pass
+    
+    try:
+        files = list(
+            Document.objects.filter(user_id=user_id, index_status='indexed')
+            .values_list('original_filename', flat=True)
+        )
+    except Exception:
+        return []
+    
+    try:
+        cache.set(key, files, INDEXED_FILES_CACHE_TTL)
+    except Exception:
+        pass
+    return files
+
+
+def get_documents_version(user_id) -> Optional[tuple]:
+    """
+    Fingerprint of the user's indexed documents, read from the shared database on
+    every call (not cached): changes whenever a document is indexed, re-indexed or
+    deleted by any process. None if the database isn't reachable.
+    """
+    try:
+        version = Document.objects.filter(user_id=user_id, index_status='indexed').aggregate(
+            count=Count('id'), last_id=Max('id'), last_indexed=Max('indexed_at')
+        )
+    except Exception:
+        return None
+    return (version['count'], version['last_id'], version['last_indexed'])
+
+
+def invalidate_indexed_files(user_id) -> None:
+    """Forget the cached file list (and cached answers) for a user (call when their documents change)."""
+    try:
+        cache.delete(_indexed_files_cache_key(user_id))
+    except Exception as e:
+        print(f"Could not invalidate indexed files cache for user {user_id}: {e}")
+    _ANSWER_CACHE.clear(user_id)
+    _CHROMA_COUNTS.clear()
+
+
+# Answers to recent first-turn questions, matched by question embedding.
+# Buckets are keyed by (user, mode, custom prompt, indexed files), so a new upload
+# in any process naturally stops old answers from matching.
+_ANSWER_CACHE = SemanticAnswerCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl_seconds=SEMANTIC_CACHE_TTL)
+
+
+# Health-checked Chroma handles shared by every VectorStoreManager on the same collection.
+# Weak values: a handle lives as long as some engine or cached chain still uses it.
+_VECTOR_STORES: "weakref.WeakValueDictionary[tuple, Chroma]" = weakref.WeakValueDictionary()
+_VECTOR_STORES_LOCK = threading.Lock()
+
+# (persist_dir, user_id) -> (monotonic time, chunk count): checks the quantized sidecar is complete
+_CHROMA_COUNTS: Dict[tuple, tuple] = {}
+
+# (persist_dir, collection) -> Matryoshka dimensions recorded for the collection (stable until a reset)
+_EMBEDDING_DIMENSIONS: Dict[tuple, Optional[int]] = {}
+
+
+# Tavily client singleton (reuses its HTTP session / connection pool across web searches)
+_TAVILY_CLIENT = None
+_TAVILY_LOCK = threading.Lock()
+
+def get_tavily_client(api_key: str):
+    """Singleton pattern for the Tavily web search client."""
+    global _TAVILY_CLIENT
+    with _TAVILY_LOCK:
+        if _TAVILY_CLIENT is None:
+            _TAVILY_CLIENT = TavilyClient(api_key=api_key)
+    return _TAVILY_CLIENT
+
+
+# Recent web search results (normalized query -> (timestamp, result)) and searches in flight.
+# Identical questions within WEB_SEARCH_CACHE_TTL skip the network, and concurrent identical
+# questions wait on a single upstream call instead of each issuing their own.
+_WEB_SEARCH_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_WEB_SEARCH_INFLIGHT: Dict[str, Future] = {}
+_WEB_SEARCH_LOCK = threading.Lock()
+
+def search_web(api_key: str, query: str) -> Dict[str, Any]:
+    """Tavily search with a TTL cache and single-flight coalescing of identical queries."""
+    key = " ".join(query.lower().split())
+    with _WEB_SEARCH_LOCK:
+        cached = _WEB_SEARCH_CACHE.get(key)
+        if cached is not None and time.time() - cached[0] < WEB_SEARCH_CACHE_TTL:
+            _WEB_SEARCH_CACHE.move_to_end(key)
+            return cached[1]
+        future = _WEB_SEARCH_INFLIGHT.get(key)
+        leader = future is None
+        if leader:
+            future = _WEB_SEARCH_INFLIGHT[key] = Future()
+    
+    if not leader:
+        return future.result()
+    
+    try:
+        # Use 'basic' search depth to save memory in hosted environments
+        result = get_tavily_client(api_key).search(query=query, search_depth="basic")
+    except Exception as e:
+        with _WEB_SEARCH_LOCK:
+            del _WEB_SEARCH_INFLIGHT[key]
+        future.set_exception(e)
+        raise
+    
+    with _WEB_SEARCH_LOCK:
+        del _WEB_SEARCH_INFLIGHT[key]
+        _WEB_SEARCH_CACHE[key] = (time.time(), result)
+        while len(_WEB_SEARCH_CACHE) > WEB_SEARCH_CACHE_SIZE:
+            _WEB_SEARCH_CACHE.popitem(last=False)
+    future.set_result(result)
+    return result
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    """Word n-gram set used for near-duplicate detection."""
+    words = text.lower().split()
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def format_docs(docs: List) -> str:
+    """
+    Join retrieved chunks into the prompt context.
+    Empty chunks (e.g. image pages where OCR found nothing) are skipped so they
+    don't add separator noise, and the result is capped to fit the LLM window.
+    Near-duplicates (shingle Jaccard >= DUPLICATE_CHUNK_JACCARD with a chunk already
+    included, e.g. the same passage from two uploads) are dropped so they don't
+    spend prefill tokens twice.
+    """
+    buffer = io.StringIO()
+    kept: List[set] = []
+    for doc in docs:
+        content = doc.page_content.strip() if doc.page_content else ""
+        if not content:
+            continue
+        shingles = _shingles(content)
+        if any(len(shingles & other) >= DUPLICATE_CHUNK_JACCARD * len(shingles | other) for other in kept):
+            continue
+        kept.append(shingles)
+        if buffer.tell():
+            buffer.write("\n\n")
+        buffer.write(f"[Source: {doc.metadata.get('source', 'unknown')}]\n{content}")
+        if buffer.tell() >= MAX_CONTEXT_CHARS:
+            break
+    return buffer.getvalue()[:MAX_CONTEXT_CHARS]
+
+
+_COMPRESSOR = None
+_COMPRESSOR_LOCK = threading.Lock()
+
+def get_prompt_compressor():
+    """Singleton LLMLingua-2 compressor (loading the model takes seconds)."""
+    global _COMPRESSOR
+    with _COMPRESSOR_LOCK:
+        if _COMPRESSOR is None:
+            _COMPRESSOR = PromptCompressor(model_name=CONTEXT_COMPRESSION_MODEL, use_llmlingua2=True, device_map="cpu")
+    return _COMPRESSOR
+
+
+def compress_docs(docs: List) -> str:
+    """
+    `format_docs`, then shrink the context with LLMLingua-2 when enabled.
+    Prefill cost grows with every context token, so dropping ~60% of low-information
+    tokens speeds up the LLM call. Short contexts are passed through unchanged.
+    """
+    context = format_docs(docs)
+    if not LLMLINGUA_AVAILABLE or len(context) < CONTEXT_COMPRESSION_MIN_CHARS:
+        return context
+    try:
+        return get_prompt_compressor().compress_prompt(
+            context,
+            rate=CONTEXT_COMPRESSION_RATE,
+            force_tokens=['\n', '.', '?'],
+        )['compressed_prompt']
+    except Exception as e:
+        print(f"Context compression failed, using full context: {e}")
+        return context
+
+
+_RERANKER = None
+_RERANKER_LOCK = threading.Lock()
+
+def get_reranker():
+    """Singleton cross-encoder, int8 ONNX when the installed sentence-transformers supports it."""
+    global _RERANKER
+    with _RERANKER_LOCK:
+        if _RERANKER is None:
+            try:
+                _RERANKER = CrossEncoder(RERANK_MODEL, backend='onnx', model_kwargs={'file_name': RERANK_ONNX_FILE})
+            except Exception as e:
+                print(f"Quantized ONNX reranker unavailable, falling back to PyTorch: {e}")
+                _RERANKER = CrossEncoder(RERANK_MODEL, device='cpu')
+    return _RERANKER
+
+
+def rerank_docs(question: str, docs: List, top_k: int = RERANK_TOP_K) -> List:
+    """
+    Keep the `top_k` docs the cross-encoder scores as most relevant to the question.
+    Vector search only compares two independently embedded vectors; the cross-encoder
+    reads question and chunk together, so it picks the best 5 out of 30 far more
+    reliably for a few milliseconds per chunk. Falls back to retrieval order.
+    """
+    if not CROSS_ENCODER_AVAILABLE or len(docs) <= top_k:
+        return docs[:top_k]
+    try:
+        scores = get_reranker().predict([(question, doc.page_content) for doc in docs])
+    except Exception as e:
+        print(f"Reranking failed, using retrieval order: {e}")
+        return docs[:top_k]
+    order = np.argsort(-np.asarray(scores), kind='stable')[:top_k]
+    return [docs[i] for i in order]
+
+
+class FastRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    Drop-in `RecursiveCharacterTextSplitter` with a cheaper merge step.
+    
+    The stock `_merge_splits` re-measures the head piece every time it slides
+    the overlap window and re-slices the pending list (`current_doc[1:]`) on
+    each pop. Here each piece is measured exactly once and kept in a deque
+    alongside its length, so sliding the window is O(1). Output is identical.
+    """
+    
+    def _merge_splits(self, splits: Iterable[str], separator: str) -> List[str]:
+        separator_len = self._length_function(separator)
+        
+        docs = []
+        current_doc: deque = deque()  # (piece, length) pairs
+        total = 0
+        for piece in splits:
+            piece_len = self._length_function(piece)
+            if total + piece_len + (separator_len if current_doc else 0) > self._chunk_size:
+                if current_doc:
+                    doc = self._join_docs([p for p, _ in current_doc], separator)
+                    if doc is not None:
+                        docs.append(doc)
+                    # Slide the window until we are back under the overlap budget
+                    while total > self._chunk_overlap or (
+                        total + piece_len + (separator_len if current_doc else 0) > self._chunk_size
+                        and total > 0
+                    ):
+                        _, head_len = current_doc.popleft()
+                        total -= head_len + (separator_len if current_doc else 0)
+            current_doc.append((piece, piece_len))
+            total += piece_len + (separator_len if len(current_doc) > 1 else 0)
+        
+        doc = self._join_docs([p for p, _ in current_doc], separator)
+        if doc is not None:
+            docs.append(doc)
+        return docs
+
+
+class RustTextSplitter:
+    """
+    `split_documents` adapter around the Rust `semantic-text-splitter` crate.
+    
+    Splits on the largest semantic level (paragraphs, sentences, words...) that
+    fits `chunk_size` characters, like the recursive splitter, but without the
+    Python-level string churn. Chunks are wrapped back into LangchainDocuments
+    with the page's metadata plus `start_index`.
+    """
+    
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._splitter = TextSplitter(chunk_size, overlap=chunk_overlap)
+    
+    def split_documents(self, documents: Iterable) -> List:
+        chunks = []
+        for doc in documents:
+            text = doc.page_content
+            search_from = 0
+            for piece in self._splitter.chunks(text):
+                start = text.find(piece, search_from)
+                if start >= 0:
+                    search_from = start + 1
+                metadata = dict(doc.metadata)
+                metadata['start_index'] = max(start, 0)
+                chunks.append(LangchainDocument(page_content=piece, metadata=metadata))
+        return chunks
+    
+    # The native splitter can't be pickled; rebuild it when sent to a worker process
+    def __getstate__(self):
+        return {'chunk_size': self.chunk_size, 'chunk_overlap': self.chunk_overlap}
+    
+    def __setstate__(self, state):
+        self.__init__(state['chunk_size'], state['chunk_overlap'])
+
+
+def make_text_splitter(chunk_size: int, chunk_overlap: int):
+    """Rust splitter when installed, otherwise the recursive character splitter."""
+    if RUST_SPLITTER_AVAILABLE:
+        return RustTextSplitter(chunk_size, chunk_overlap)
+    return FastRecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        add_start_index=True,
+    )
 
 
 class DocumentProcessor:
@@ -93,17 +686,19 @@ class DocumentProcessor:
     manageable `CHUNK_SIZE` blocks (e.g. 800 chars).
     """
     
-    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 parallel_split: bool = True):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            add_start_index=True,
-        )
+        self.parallel_split = parallel_split
+        self.text_splitter = make_text_splitter(chunk_size, chunk_overlap)
+        # Parent-child (small-to-big) mode: embed small children, answer from their parents
+        self.parent_child = PARENT_CHILD_CHUNKING
+        self.parent_splitter = make_text_splitter(PARENT_CHUNK_SIZE, PARENT_CHUNK_OVERLAP)
+        self.child_splitter = make_text_splitter(CHILD_CHUNK_SIZE, CHILD_CHUNK_OVERLAP)
     
-    def load_single_document(self, file_path: str, user_id: int = None, original_filename: str = None) -> List:
+    def load_single_document(self, file_path: str, user_id: int = None, original_filename: str = None,
+                             skip_if_indexed: bool = True) -> List:
         """
         Load a single document and return chunks with user metadata.
         
@@ -111,6 +706,8 @@ class DocumentProcessor:
             file_path: Absolute path to file on disk.
             user_id: The ID of the owner (CRITICAL for data isolation).
             original_filename: Display name of the file.
+            skip_if_indexed: If the user already has a byte-identical file indexed, copy
+                its chunks instead of re-reading the file (set False to force a re-index).
         """
         path = Path(file_path)
         
@@ -123,6 +720,27 @@ class DocumentProcessor:
         # Use provided filename or fallback to path name
         source_name = original_filename or path.name
         
+        file_hash = hash_file(str(path))
+        # Ensure source is the friendly name, not the UUID path; user_id enables filtering
+        base_meta = {'source': source_name, 'file_path': str(path), 'file_hash': file_hash}
+        if user_id is not None:
+            base_meta['user_id'] = str(user_id)
+        
+        # Identical re-upload: copy the indexed chunks under this file (skips OCR/splitting, and
+        # their embeddings are cache hits). Each Document keeps its own vectors, so deleting
+        # either copy leaves the other searchable.
+        if user_id is not None and skip_if_indexed:
+            existing = get_ingest_index().lookup(user_id, file_hash)
+            if existing and existing['file_path'] != str(path) and Path(existing['file_path']).exists():
+                try:
+                    chunks = self._copy_indexed_chunks(existing['file_path'], user_id, base_meta)
+                except Exception as e:
+                    print(f"Could not copy chunks of {existing['source']}, indexing from scratch: {e}")
+                    chunks = []
+                if chunks:
+                    print(f"Copied {len(chunks)} chunks for {source_name} from identical {existing['source']}")
+                    return chunks
+        
         # Check if this is an image file - use OCR
         if ext in ['.png', '.jpg', '.jpeg', '.tiff', '.tif', '.bmp', '.gif']:
             if not OCR_ENABLED:
@@ -161,8 +779,19 @@ class DocumentProcessor:
             
             # If no OCR results, use standard PDF loader
             if not documents:
-                loader = PyPDFLoader(str(path))
-                documents = loader.load()
+                if PYMUPDF_AVAILABLE:
+                    # MuPDF extracts the text layer several times faster than pypdf
+                    with pymupdf.open(str(path)) as pdf:
+                        documents = [
+                            LangchainDocument(
+                                page_content=page.get_text("text"),
+                                metadata={'source': source_name, 'file_path': str(path), 'page': i + 1}
+                            )
+                            for i, page in enumerate(pdf)
+                        ]
+                else:
+                    loader = PyPDFLoader(str(path))
+                    documents = loader.load()
         
         elif ext in ['.txt', '.md']:
             loader = TextLoader(str(path))
@@ -171,68 +800,239 @@ class DocumentProcessor:
         else:
             raise ValueError(f"Unsupported file type: {ext}")
         
-        chunks = self.text_splitter.split_documents(documents)
+        if self.parent_child:
+            parents = self._normalize_chunk_sizes(
+                self._split_documents(documents, self.parent_splitter),
+                self.parent_splitter, PARENT_CHUNK_SIZE
+            )
+            for parent in parents:
+                parent.metadata.update(base_meta)
+                parent.metadata['parent_id'] = uuid.uuid4().hex
+            # Parents are persisted by create_vector_store once the children's vectors are written
+            return self._split_children(parents)
         
-        # Add metadata locally
+        chunks = self._normalize_chunk_sizes(
+            self._split_documents(documents), self.text_splitter, self.chunk_size
+        )
         for chunk in chunks:
-            # Ensure source is the friendly name, not the UUID path
-            chunk.metadata['source'] = source_name
-            chunk.metadata['file_path'] = str(path)
-            
-            # Add user_id for filtering
-            if user_id is not None:
-                chunk.metadata['user_id'] = str(user_id)
+            chunk.metadata.update(base_meta)
         
         return chunks
     
+    @staticmethod
+    def _copy_indexed_chunks(file_path: str, user_id, base_meta: Dict[str, Any]) -> List:
+        """
+        Chunks already indexed for `file_path`, re-stamped with `base_meta` (new source/path).
+        Parent chunks are copied under new ids and attached for `create_vector_store` to persist.
+        """
+        collection = VectorStoreManager(user_id=user_id).collection
+        found = collection.get(
+            where={"$and": [{"file_path": {"$eq": file_path}}, {"user_id": {"$eq": str(user_id)}}]},
+            include=["documents", "metadatas"],
+        )
+        metadatas = [dict(meta or {}) for meta in found["metadatas"]]
+        parent_ids = list(dict.fromkeys(m['parent_id'] for m in metadatas if m.get('parent_id')))
+        old_parents = get_parent_store().get(parent_ids) if parent_ids else {}
+        
+        new_parents = {}
+        for old_id, parent in old_parents.items():
+            metadata = {**parent.metadata, **base_meta, 'parent_id': uuid.uuid4().hex}
+            new_parents[old_id] = LangchainDocument(page_content=parent.page_content, metadata=metadata)
+        
+        chunks = []
+        for text, metadata in zip(found["documents"], metadatas):
+            metadata.update(base_meta)
+            parent = new_parents.get(metadata.get('parent_id'))
+            if parent is not None:
+                metadata['parent_id'] = parent.metadata['parent_id']
+                metadata[PARENT_CHUNK_KEY] = parent
+            chunks.append(LangchainDocument(page_content=text, metadata=metadata))
+        chunks.sort(key=lambda c: (c.metadata.get('page') or 0, c.metadata.get('start_index') or 0))
+        return chunks
+    
+    def _normalize_chunk_sizes(self, chunks: List, splitter, chunk_size: int) -> List:
+        """
+        Post-pass over splitter output:
+        1. Merge tiny chunks (< MIN_CHUNK_CHARS) into the neighbouring chunk of the
+           same source and page, as long as the result stays within 1.1x chunk_size.
+           They waste an embedding call and a retrieval slot on their own.
+           The splitter's overlap is cut from the second piece (via start_index)
+           so merged text isn't repeated.
+        2. Re-split any outlier that still exceeds 1.1x chunk_size.
+        The merged chunk keeps the first piece's metadata (incl. start_index).
+        """
+        max_len = int(chunk_size * 1.1)
+        
+        merged = []
+        prev_end = None  # Page offset where the last merged chunk's text ends (None = unknown)
+        for chunk in chunks:
+            prev = merged[-1] if merged else None
+            start = chunk.metadata.get('start_index')
+            text, separator = chunk.page_content, "\n"
+            if prev_end is not None and start is not None and start < prev_end:
+                text, separator = text[prev_end - start:], ""
+            if (
+                prev is not None
+                and prev.metadata.get('source') == chunk.metadata.get('source')
+                and prev.metadata.get('page') == chunk.metadata.get('page')
+                and (len(prev.page_content) < MIN_CHUNK_CHARS or len(chunk.page_content) < MIN_CHUNK_CHARS)
+                and len(prev.page_content) + len(separator) + len(text) <= max_len
+            ):
+                if text:
+                    prev.page_content = f"{prev.page_content}{separator}{text}"
+            else:
+                merged.append(chunk)
+            prev_end = start + len(chunk.page_content) if start is not None else None
+        
+        result = []
+        for chunk in merged:
+            if len(chunk.page_content) > max_len:
+                offset = chunk.metadata.get('start_index', 0)
+                for piece in splitter.split_documents([chunk]):
+                    piece.metadata['start_index'] = offset + piece.metadata.get('start_index', 0)
+                    result.append(piece)
+            else:
+                result.append(chunk)
+        return result
+    
+    def _split_children(self, parents: List) -> List:
+        """
+        Cut each parent into small child chunks for embedding.
+        Children inherit the parent's metadata (incl. `parent_id`); start_index
+        is shifted so it stays relative to the original page.
+        """
+        children = []
+        for parent in parents:
+            offset = parent.metadata.get('start_index', 0)
+            for child in self.child_splitter.split_documents([parent]):
+                child.metadata['start_index'] = offset + child.metadata.get('start_index', 0)
+                child.metadata[PARENT_CHUNK_KEY] = parent
+                children.append(child)
+        return children
+    
+    def _split_documents(self, documents: List, splitter=None) -> List:
+        """
+        Split pages into chunks, fanning out across processes for long documents.
+        
+        Splitting is CPU-bound string work, so threads would just
+        fight over the GIL. Each page is split independently (start_index is
+        relative to its own page), so batches can be merged back in order.
+        
+        Daemonic processes (Celery prefork workers) can't have children, so
+        uploads processed by a Celery task always split serially.
+        """
+        splitter = splitter or self.text_splitter
+        workers = os.cpu_count() or 1
+        if (not self.parallel_split or len(documents) <= PARALLEL_SPLIT_THRESHOLD or workers < 2
+                or multiprocessing.current_process().daemon):
+            return splitter.split_documents(documents)
+        
+        batch_size = -(-len(documents) // workers)  # ceil division
+        batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+        
+        try:
+            with ProcessPoolExecutor(max_workers=len(batches)) as executor:
+                results = executor.map(splitter.split_documents, batches)
+                return [chunk for batch in results for chunk in batch]
+        except Exception as e:
+            print(f"Parallel split unavailable, splitting serially: {e}")
+            return splitter.split_documents(documents)
+    
     def load_all_documents(self, directory: str = None) -> List:
-        """Load all documents from a directory."""
+        """
+        Load all documents from a directory.
+        Files are parsed in parallel (one process per core) since PDF parsing and
+        OCR are CPU-bound and independent per file.
+        """
         directory = directory or DATA_DIR
         data_path = Path(directory)
         
         if not data_path.exists():
             return []
         
-        all_chunks = []
-        
-        # Process PDFs
-        for pdf_file in data_path.glob("**/*.pdf"):
-            try:
-                chunks = self.load_single_document(str(pdf_file))
-                all_chunks.extend(chunks)
-            except Exception as e:
-                print(f"Error loading {pdf_file}: {e}")
-        
-        # Process TXT files
-        for txt_file in data_path.glob("**/*.txt"):
-            try:
-                chunks = self.load_single_document(str(txt_file))
-                all_chunks.extend(chunks)
-            except Exception as e:
-                print(f"Error loading {txt_file}: {e}")
-        
-        # Process MD files
-        for md_file in data_path.glob("**/*.md"):
-            try:
-                chunks = self.load_single_document(str(md_file))
-                all_chunks.extend(chunks)
-            except Exception as e:
-                print(f"Error loading {md_file}: {e}")
-        
-        # Process image files (OCR)
+        patterns = ["**/*.pdf", "**/*.txt", "**/*.md"]
         if OCR_ENABLED:
-            for img_ext in ['png', 'jpg', 'jpeg', 'tiff', 'tif', 'bmp']:
-                for img_file in data_path.glob(f"**/*.{img_ext}"):
-                    try:
-                        chunks = self.load_single_document(str(img_file))
-                        all_chunks.extend(chunks)
-                    except Exception as e:
-                        print(f"Error loading image {img_file}: {e}")
+            patterns += [f"**/*.{img_ext}" for img_ext in ['png', 'jpg', 'jpeg', 'tiff', 'tif', 'bmp']]
+        all_files = [str(f) for pattern in patterns for f in data_path.glob(pattern)]
+        
+        jobs = [(f, self.chunk_size, self.chunk_overlap) for f in all_files]
+        all_chunks = []
+        readahead = _Readahead(all_files)
+        try:
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                for chunks in executor.map(_load_one_safe, jobs):
+                    readahead.advance()
+                    all_chunks.extend(chunks)
+        except Exception as e:
+            # Daemonic workers (e.g. Celery prefork) cannot spawn children
+            print(f"Parallel loading unavailable, loading serially: {e}")
+            all_chunks = []
+            for job in jobs:
+                all_chunks.extend(_load_one_safe(job))
+                readahead.advance()
+        finally:
+            readahead.stop()
         
         print(f"Loaded and chunked {len(all_chunks)} pieces from documents.")
         return all_chunks
 
 
+class _Readahead:
+    """
+    Background page-cache prefetch for bulk loading (Linux `posix_fadvise`).
+    
+    Parsers otherwise stall on blocking reads of each PDF. A thread asks the
+    kernel to start reading the next READAHEAD_FILES files (WILLNEED is
+    asynchronous, so disk I/O overlaps with parsing) and waits for `advance()`
+    before going further, so a large corpus doesn't evict its own prefetched bytes.
+    """
+    
+    def __init__(self, paths: List[str]):
+        self._paths = paths
+        self._window = threading.Semaphore(READAHEAD_FILES)
+        self._stopped = threading.Event()
+        if hasattr(os, 'posix_fadvise') and paths:
+            threading.Thread(target=self._run, name="pdf-readahead", daemon=True).start()
+    
+    def _run(self) -> None:
+        for path in self._paths:
+            self._window.acquire()
+            if self._stopped.is_set():
+                return
+            try:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass  # Prefetch is only a hint; the parser reports real read errors
+    
+    def advance(self) -> None:
+        """One file finished parsing: allow one more to be prefetched."""
+        self._window.release()
+    
+    def stop(self) -> None:
+        self._stopped.set()
+        self._window.release()
+
+
+def _load_one_safe(job: tuple) -> List:
+    """
+    Process-pool worker for `load_all_documents`: load one file, never raise.
+    Each file already gets its own process, so the splitter and OCR stay serial here.
+    """
+    file_path, chunk_size, chunk_overlap = job
+    if OCR_ENABLED:
+        set_default_ocr_workers(1)
+    try:
+        processor = DocumentProcessor(chunk_size, chunk_overlap, parallel_split=False)
+        return processor.load_single_document(file_path)
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return []
+
+
 class VectorStoreManager:
     """
     Manages ChromaDB vector store operations.
@@ -241,13 +1041,28 @@ class VectorStoreManager:
     It stamps every vector with `user_id` upon creation to ensure data privacy.
     """
     
-    def __init__(self, persist_directory: str = CHROMA_DIR, user_id: int = None):
+    def __init__(self, persist_directory: str = CHROMA_DIR, user_id: int = None,
+                 quantization: Optional[str] = VECTOR_QUANTIZATION):
         self.persist_directory = persist_directory
         self.user_id = user_id
+        # "binary"/"int8": also keep a binary + int8 compressed copy of the vectors and search that
+        self.quantization = quantization
         self.collection_name = "knowbot_docs"
         self._embeddings = None
+        self._vector_store = None  # Health-checked Chroma handle, reused across calls
+        self._collection = None  # Raw collection handle for inserts/deletes
         # Initialize client explicitly using singleton
         self.client = get_chroma_client(persist_directory)
+    
+    @property
+    def collection(self):
+        """
+        Raw Chroma collection, created on first use and reused afterwards.
+        `get_or_create_collection` never raises for a missing collection, unlike `get_collection`.
+        """
+        if self._collection is None:
+            self._collection = self.client.get_or_create_collection(self.collection_name, embedding_function=None)
+        return self._collection
 
     @property
     def embeddings(self):
@@ -255,21 +1070,123 @@ class VectorStoreManager:
         if self._embeddings is None:
             if EMBEDDING_PROVIDER == 'openai':
                 print("Using OpenAI Embeddings")
-                self._embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=OPENAI_API_KEY)
+                model_tag = "text-embedding-3-small"
+                self._embeddings = OpenAIEmbeddings(model=model_tag, api_key=OPENAI_API_KEY)
             elif EMBEDDING_PROVIDER == 'huggingface':
-                print("Using HuggingFace Embeddings (Local/In-container)")
-                self._embeddings = HuggingFaceEmbeddings(
-                    model_name="all-MiniLM-L6-v2",
-                    model_kwargs={'device': 'cpu'}
-                )
+                self._embeddings, model_tag = self._build_huggingface_embeddings()
+            elif EMBEDDING_PROVIDER == 'onnx' and get_onnx_embeddings() is not None:
+                self._embeddings = get_onnx_embeddings()
+                model_tag = self._embeddings.model_tag
             else:
                 print(f"Using Ollama Embeddings at {OLLAMA_HOST}")
-                self._embeddings = OllamaEmbeddings(
-                    model=EMBEDDING_MODEL,
-                    base_url=OLLAMA_HOST
-                )
+                model_tag = EMBEDDING_MODEL
+                self._embeddings = get_ollama_embeddings()
+            dimensions = self._embedding_dimensions()
+            if dimensions:
+                self._embeddings = MatryoshkaEmbeddings(self._embeddings, dimensions)
+                model_tag = f"{model_tag}_d{dimensions}"
+            namespace = self._embedding_namespace(model_tag)
+            self._embeddings = QueryCachedEmbeddings(
+                self._with_embedding_cache(self._embeddings, namespace),
+                namespace
+            )
         return self._embeddings
     
+    @staticmethod
+    def _build_huggingface_embeddings():
+        """
+        Local sentence-transformers embedder.
+        Prefers the int8-quantized ONNX export of MiniLM (VNNI int8 matmuls are
+        several times faster than fp32 PyTorch on CPU); falls back to PyTorch
+        if onnxruntime/optimum aren't installed.
+        
+        Returns:
+            (embeddings, model_tag) - the tag keeps cached vectors per variant
+        """
+        model_name = "all-MiniLM-L6-v2"
+        encode_kwargs = {'batch_size': EMBEDDING_BATCH_SIZE, 'normalize_embeddings': True}
+        
+        if HF_EMBEDDING_ONNX_FILE:
+            try:
+                embeddings = HuggingFaceEmbeddings(
+                    model_name=model_name,
+                    model_kwargs={
+                        'device': 'cpu',
+                        'backend': 'onnx',
+                        'model_kwargs': {'file_name': HF_EMBEDDING_ONNX_FILE},
+                    },
+                    encode_kwargs=encode_kwargs
+                )
+                print(f"Using HuggingFace Embeddings (ONNX {HF_EMBEDDING_ONNX_FILE}, Local/In-container)")
+                return embeddings, f"{model_name}_{Path(HF_EMBEDDING_ONNX_FILE).stem}"
+            except Exception as e:
+                print(f"Quantized ONNX embeddings unavailable, falling back to PyTorch: {e}")
+        
+        print("Using HuggingFace Embeddings (Local/In-container)")
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs=encode_kwargs
+        )
+        return embeddings, model_name
+    
+    def _embedding_dimensions(self) -> Optional[int]:
+        """
+        Matryoshka dimensions for this collection (None = full vectors).
+        
+        Stored in the collection metadata when the collection is empty, so queries are
+        always truncated like the vectors already stored, even if EMBEDDING_DIMENSIONS
+        changes later. Changing it takes effect after a reset + re-index.
+        """
+        uses_nomic = EMBEDDING_PROVIDER == 'onnx' or (
+            EMBEDDING_PROVIDER not in ('openai', 'huggingface') and 'nomic' in EMBEDDING_MODEL
+        )
+        if not uses_nomic:
+            return None
+        
+        key = (self.persist_directory, self.collection_name)
+        if key in _EMBEDDING_DIMENSIONS:
+            return _EMBEDDING_DIMENSIONS[key]
+        
+        metadata = dict(self.collection.metadata or {})
+        if self.collection.count() == 0:
+            if metadata.get('embedding_dimensions') != (EMBEDDING_DIMENSIONS or 0):
+                # Distance settings can't be modified after creation, so only the new key is sent
+                metadata = {k: v for k, v in metadata.items() if not k.startswith('hnsw:')}
+                metadata['embedding_dimensions'] = EMBEDDING_DIMENSIONS or 0
+                self.collection.modify(metadata=metadata)
+            dimensions = EMBEDDING_DIMENSIONS
+        else:
+            # Vectors written before dimensions were recorded are full-size
+            dimensions = metadata.get('embedding_dimensions') or None
+            if dimensions != EMBEDDING_DIMENSIONS:
+                print(f"Warning: collection stores {dimensions or 'full'}-d vectors; "
+                      f"EMBEDDING_DIMENSIONS={EMBEDDING_DIMENSIONS} applies after a reset + re-index.")
+        _EMBEDDING_DIMENSIONS[key] = dimensions
+        return dimensions
+    
+    @staticmethod
+    def _embedding_namespace(model_tag: str) -> str:
+        """Provider/model tag used to keep cached vectors from different models apart."""
+        # Plain [a-zA-Z0-9_.-] tag, safe to use in cache keys
+        return re.sub(r'[^a-zA-Z0-9_.\-]', '_', f"{EMBEDDING_PROVIDER}_{model_tag}")
+    
+    def _with_embedding_cache(self, underlying: Embeddings, namespace: str) -> Embeddings:
+        """
+        Wrap the embedder in a persistent cache keyed by SHA-256 of the chunk text.
+        Re-ingesting unchanged passages becomes an SQLite lookup instead of a model call;
+        only cache misses are sent to the embedder.
+        """
+        if not EMBEDDING_CACHE_ENABLED:
+            return underlying
+        
+        try:
+            store = EmbeddingStore(str(Path(CHROMA_DIR) / "embed_cache.sqlite"), namespace)
+            return CacheBackedEmbeddings(underlying, store)
+        except Exception as e:
+            print(f"Embedding cache unavailable, embedding without cache: {e}")
+            return underlying
+    
     def create_vector_store(self, chunks: List) -> Chroma:
         """Create or add to vector store from document chunks."""
         if not chunks:
@@ -277,9 +1194,10 @@ class VectorStoreManager:
         
         # Add user_id to each chunk's metadata if not already set
         if self.user_id is not None:
+            uid_str = str(self.user_id)
             for chunk in chunks:
-                if 'user_id' not in chunk.metadata:
-                    chunk.metadata['user_id'] = str(self.user_id)
+                chunk.metadata.setdefault('user_id', uid_str)
+        parents = self._pop_parents(chunks)
         
         vector_store = Chroma(
             client=self.client,
@@ -287,43 +1205,254 @@ class VectorStoreManager:
             embedding_function=self.embeddings,
         )
         
-        vector_store.add_documents(chunks)
+        # Embed in small batches (bounded request size per embedding call), but buffer
+        # the results and write them to Chroma in large batches: every add is its own
+        # SQLite transaction + fsync, so many tiny adds dominate ingestion time.
+        collection = self.collection
+        write_batch_size = min(CHROMA_WRITE_BATCH_SIZE, self.client.get_max_batch_size())
+        pending: Dict[str, list] = {'ids': [], 'embeddings': [], 'documents': [], 'metadatas': []}
+        quantized: Dict[Any, tuple] = {}  # owner user_id -> (ids, file_paths, vector arrays)
+        
+        def flush():
+            if pending['ids']:
+                collection.add(**pending)
+                for values in pending.values():
+                    values.clear()
+        
+        for batch, embeddings in self._embed_batches(chunks):
+            metadatas = [
+                {k: v for k, v in chunk.metadata.items() if v is not None}
+                for chunk in batch
+            ]
+            ids = [uuid.uuid4().hex for _ in batch]
+            # float32 arrays keep a full buffer at ~15 MB instead of ~100 MB of Python floats
+            vectors = [np.asarray(vector, dtype=np.float32) for vector in embeddings]
+            if len(pending['ids']) + len(ids) > write_batch_size:
+                flush()
+            pending['ids'].extend(ids)
+            pending['embeddings'].extend(vectors)
+            pending['documents'].extend(chunk.page_content for chunk in batch)
+            pending['metadatas'].extend(metadatas)
+            if self.quantization in ("binary", "int8"):
+                for chunk_id, meta, vector in zip(ids, metadatas, vectors):
+                    owner = quantized.setdefault(meta.get('user_id'), ([], [], []))
+                    owner[0].append(chunk_id)
+                    owner[1].append(meta.get('file_path', ''))
+                    owner[2].append(vector)
+        flush()
         print(f"Added {len(chunks)} chunks to vector store for user {self.user_id}")
         
+        # Only now that the children are searchable: a failed embed/write leaves no orphaned parents
+        if parents:
+            try:
+                get_parent_store().add(parents)
+            except Exception as e:
+                print(f"Error storing parent chunks (answers will use child chunks): {e}")
+        
+        for owner, (ids, file_paths, vectors) in quantized.items():
+            try:
+                update_quantized_index(self._quantized_index_path(owner), ids, file_paths, np.stack(vectors))
+            except Exception as e:
+                print(f"Error updating quantized index for user {owner}: {e}")
+        invalidate_indexed_files(self.user_id)
+        self._record_ingested_files(chunks)
+        
         # Also update BM25 index for hybrid search
         if HYBRID_SEARCH_ENABLED:
-            update_bm25_index(chunks, user_id=self.user_id)
+            update_bm25_index(chunks, user_id=self.user_id, incremental=True)
             print(f"Updated BM25 index with {len(chunks)} chunks")
         
         return vector_store
     
+    @staticmethod
+    def _pop_parents(chunks: List) -> List:
+        """
+        Detach the parent Documents children carry in their metadata (one per parent_id).
+        Parents inherit their first child's owner, so bulk-loaded files are cleaned up per user too.
+        """
+        parents = {}
+        for chunk in chunks:
+            parent = chunk.metadata.pop(PARENT_CHUNK_KEY, None)
+            if parent is None:
+                continue
+            if chunk.metadata.get('user_id') is not None:
+                parent.metadata.setdefault('user_id', chunk.metadata['user_id'])
+            parents.setdefault(parent.metadata['parent_id'], parent)
+        return list(parents.values())
+    
+    def _embed_batches(self, chunks: List):
+        """
+        Yield (batch, embeddings) for EMBEDDING_BATCH_SIZE-chunk batches, in order.
+        
+        Remote embedders spend most of each call waiting on HTTP, so up to
+        EMBEDDING_WORKERS batches are in flight at once. In-process models
+        (HuggingFace, ONNX) already use every core per batch and are called serially.
+        """
+        workers = 1 if EMBEDDING_PROVIDER in ('huggingface', 'onnx') else EMBEDDING_WORKERS
+        embedder = self.embeddings  # Resolve the lazy property before any threads touch it
+        embed = lambda batch: embedder.embed_documents([chunk.page_content for chunk in batch])
+        
+        chunk_iter = iter(chunks)
+        batches = iter(lambda: list(islice(chunk_iter, EMBEDDING_BATCH_SIZE)), [])
+        if workers == 1:
+            for batch in batches:
+                yield batch, embed(batch)
+            return
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # One window of `workers` batches at a time keeps memory bounded on huge files
+            while window := list(islice(batches, workers)):
+                yield from zip(window, executor.map(embed, window))
+    
+    def _record_ingested_files(self, chunks: List):
+        """Remember the hash of every file whose chunks were just written, so re-uploads are skipped."""
+        files = {
+            (chunk.metadata.get('user_id'), chunk.metadata.get('file_hash')): chunk.metadata
+            for chunk in chunks
+        }
+        try:
+            ingest_index = get_ingest_index()
+            for (user_id, file_hash), meta in files.items():
+                if user_id is not None and file_hash:
+                    ingest_index.record(user_id, file_hash, meta.get('file_path'), meta.get('source'))
+        except Exception as e:
+            print(f"Error recording ingested files: {e}")
+    
     def delete_from_vector_store(self, file_path: str):
         """Delete all vectors associated with a specific file path."""
         try:
-            collection = self.client.get_collection(self.collection_name)
-            # Try deleting by file_path usage in metadata (new schema)
-            collection.delete(where={"file_path": file_path})
-            # Also try deleting by source (legacy/fallback)
-            collection.delete(where={"source": file_path})
+            # Match by file_path (new schema) OR source (legacy/fallback) in a single pass
+            self.collection.delete(where={"$or": [
+                {"file_path": {"$eq": file_path}},
+                {"source": {"$eq": file_path}},
+            ]})
             print(f"Deleted vectors for {file_path}")
         except Exception as e:
             print(f"Error deleting vectors for {file_path}: {e}")
+        
+        # Each sidecar is cleaned up on its own, so one failing can't leave the others stale
+        try:
+            get_ingest_index().delete_for_file(file_path)
+        except Exception as e:
+            print(f"Error deleting ingest index entry for {file_path}: {e}")
+        try:
+            get_parent_store().delete_for_file(file_path)
+        except Exception as e:
+            print(f"Error deleting parent chunks for {file_path}: {e}")
+        try:
+            remove_from_quantized_index(self._quantized_index_path(self.user_id), file_path)
+        except Exception as e:
+            print(f"Error deleting quantized vectors for {file_path}: {e}")
+        if HYBRID_SEARCH_ENABLED:
+            try:
+                remove_from_bm25_index(file_path, user_id=self.user_id)
+            except Exception as e:
+                print(f"Error deleting BM25 entries for {file_path}: {e}")
             
     def reset_vector_store(self):
         """Delete entire collection for the user."""
+        # An emptied collection records the current EMBEDDING_DIMENSIONS on next use
+        _EMBEDDING_DIMENSIONS.pop((self.persist_directory, self.collection_name), None)
         try:
-            collection = self.client.get_collection(self.collection_name)
             if self.user_id:
-                collection.delete(where={"user_id": str(self.user_id)})
+                self.collection.delete(where={"user_id": str(self.user_id)})
+                if HYBRID_SEARCH_ENABLED:
+                    delete_bm25_index(self.user_id)
                 print(f"Deleted all vectors for user {self.user_id}")
             else:
                 self.client.delete_collection(self.collection_name)
+                self._collection = None
+                self._vector_store = None
+                with _VECTOR_STORES_LOCK:
+                    _VECTOR_STORES.pop((self.persist_directory, self.collection_name), None)
+                if HYBRID_SEARCH_ENABLED:
+                    delete_all_bm25_indexes()
                 print("Deleted entire collection")
         except Exception as e:
             print(f"Error resetting vector store: {e}")
+        
+        try:
+            get_ingest_index().delete_for_user(self.user_id)
+        except Exception as e:
+            print(f"Error resetting ingest index: {e}")
+        try:
+            get_parent_store().delete_for_user(self.user_id)
+        except Exception as e:
+            print(f"Error resetting parent chunks: {e}")
+        try:
+            if self.user_id:
+                delete_quantized_index(self._quantized_index_path(self.user_id))
+            else:
+                for path in self._quantized_index_path(None).parent.glob("*.npz"):
+                    delete_quantized_index(path)
+        except Exception as e:
+            print(f"Error resetting quantized index: {e}")
+    
+    def _chroma_chunk_count(self) -> int:
+        """Chunks this user has in Chroma (cached for INDEXED_FILES_CACHE_TTL seconds)."""
+        key = (self.persist_directory, self.user_id)
+        cached = _CHROMA_COUNTS.get(key)
+        if cached is not None and time.monotonic() - cached[0] < INDEXED_FILES_CACHE_TTL:
+            return cached[1]
+        if self.user_id is not None:
+            count = len(self.collection.get(where={"user_id": str(self.user_id)}, include=[])["ids"])
+        else:
+            count = self.collection.count()
+        _CHROMA_COUNTS[key] = (time.monotonic(), count)
+        return count
+    
+    def _quantized_index_path(self, user_id) -> Path:
+        """Sidecar file holding a user's binary/int8 vector codes."""
+        return Path(self.persist_directory) / "quantized" / f"user_{user_id or 0}.npz"
+    
+    def quantized_search_with_score(self, query: str, k: int = 5) -> Optional[List[tuple]]:
+        """
+        Search the compressed sidecar index instead of Chroma's HNSW index.
+        "binary": Hamming shortlist + int8 rerank pick the k ids.
+        "int8": an int8 scan picks k * INT8_RERANK_FACTOR candidates, reranked in fp32 to k.
+        The final results are scored with their full-precision vectors (squared L2,
+        like Chroma) so relevance thresholds still apply.
+        
+        Returns:
+            [(Document, distance)] sorted by distance, or None if this user has no quantized index
+        """
+        index = get_quantized_index(self._quantized_index_path(self.user_id))
+        if not len(index):
+            return None
+        if len(index) < self._chroma_chunk_count():
+            # Some vectors never reached the sidecar (indexed before quantization was
+            # enabled, or a failed update): searching it would silently skip them
+            return None
+        
+        query_vector = self.embeddings.embed_query(query)
+        if self.quantization == "int8":
+            ids = index.search_int8(query_vector, k=k * INT8_RERANK_FACTOR)
+        else:
+            ids = index.search(query_vector, k=k)
+        found = self.collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        if not found["ids"]:
+            return []
+        
+        distances = np.sum((np.asarray(found["embeddings"], dtype=np.float32) - np.asarray(query_vector, dtype=np.float32)) ** 2, axis=1)
+        results = [
+            (LangchainDocument(page_content=text, metadata=meta or {}), float(distance))
+            for text, meta, distance in zip(found["documents"], found["metadatas"], distances)
+        ]
+        return sorted(results, key=lambda pair: pair[1])[:k]
     
     def load_vector_store(self) -> Optional[Chroma]:
-        """Load existing vector store with health check to handle disk corruption."""
+        """
+        Load existing vector store with health check to handle disk corruption.
+        The checked handle is memoized, so repeat calls (retriever + scoring) are free.
+        """
+        if self._vector_store is not None:
+            return self._vector_store
+        key = (self.persist_directory, self.collection_name)
+        with _VECTOR_STORES_LOCK:
+            shared = _VECTOR_STORES.get(key)
+        if shared is not None:
+            self._vector_store = shared
+            return shared
         try:
             vector_store = Chroma(
                 client=self.client,
@@ -344,6 +1473,9 @@ class VectorStoreManager:
                 raise e # Re-throw other genuine errors
                 
             print(f"Loaded vector store for user {self.user_id}")
+            self._vector_store = vector_store
+            with _VECTOR_STORES_LOCK:
+                _VECTOR_STORES[key] = vector_store
             return vector_store
         except Exception as e:
             print(f"⚠️ Vector store load failed or directory missing: {e}")
@@ -356,17 +1488,37 @@ class VectorStoreManager:
         return self.load_vector_store()
 
 
+def _escape_braces(text: str) -> str:
+    """Make literal text (file names, custom personas) safe to embed in a prompt template."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _chat_prompt(system: str, user: str, has_history: bool = False) -> ChatPromptTemplate:
+    """
+    System message, then prior turns (as real chat messages), then the user message.
+    Everything that changes per question lives in `user`, after the cacheable prefix.
+    """
+    messages = [("system", system)]
+    if has_history:
+        messages.append(MessagesPlaceholder("chat_history"))
+    messages.append(("human", user))
+    return ChatPromptTemplate.from_messages(messages)
+
+
 class RAGEngine:
     
-    DEFAULT_TEMPLATE = """You are KnowBot, a professional AI Knowledge Engine.
+    # Static instructions go in the system message and never contain per-request
+    # fields, so the prompt prefix is byte-identical across questions and Ollama
+    # can reuse its KV cache for it. Files, context and question follow in the user turn.
+    DEFAULT_SYSTEM_PROMPT = """You are KnowBot, a professional AI Knowledge Engine.
 You answer questions based ONLY on the provided Context and the list of Files in your collection.
 
 CRITICAL INSTRUCTION:
-- If asked "What files do I have?", refer ONLY to the [FILES_IN_COLLECTION] list below.
+- If asked "What files do I have?", refer ONLY to the [FILES_IN_COLLECTION] list.
 - Do NOT list files, datasets, or technologies mentioned INSIDE the text of these documents as files actually uploaded to this system.
-- For example, if a resume mentions "worked with 10k images", you do NOT have those image files in your collection. You only have the resume.
-
-[FILES_IN_COLLECTION]:
+- For example, if a resume mentions "worked with 10k images", you do NOT have those image files in your collection. You only have the resume."""
+    
+    DEFAULT_USER_TEMPLATE = """[FILES_IN_COLLECTION]:
 {file_list}
 
 [CONTEXT]:
@@ -376,6 +1528,38 @@ Question: {question}
 
 Answer:"""
     
+    REFORM_TEMPLATE = """Given the following conversation history and a follow-up question, rephrase the follow-up question to be a standalone search query.
+Chat History:
+{chat_history}
+Follow Up Input: {question}
+Standalone Question:"""
+    
+    # Static prompts are parsed once at import instead of on every request.
+    # Keyed by has_history; custom personas are still built per call.
+    _REFORM_PROMPT = ChatPromptTemplate.from_template(REFORM_TEMPLATE)
+    _GENERAL_PROMPTS = {
+        has_history: _chat_prompt(
+            "You are KnowBot, a helpful AI assistant.",
+            "Question: {question}\n\nAnswer:",
+            has_history
+        )
+        for has_history in (False, True)
+    }
+    _WEB_PROMPTS = {
+        has_history: _chat_prompt(
+            "You are KnowBot, a helpful AI assistant with live web access.\n"
+            "Use the search results provided with each question to answer it accurately.\n"
+            "Always cite your sources using the URLs provided.",
+            "Web Search Results:\n{web_context}\n\nQuestion: {question}\n\nAnswer:",
+            has_history
+        )
+        for has_history in (False, True)
+    }
+    
+    # Compiled RAG prompts shared across requests (RAGEngine itself is per-request)
+    _PROMPT_CACHE: "OrderedDict[tuple, ChatPromptTemplate]" = OrderedDict()
+    _PROMPT_CACHE_LOCK = threading.Lock()
+    
     def __init__(self, custom_prompt: Optional[str] = None, user_id: int = None):
         self.custom_prompt = custom_prompt
         self.user_id = user_id
@@ -385,11 +1569,7 @@ Answer:"""
         if LLM_PROVIDER == 'groq':
             if not GROQ_API_KEY:
                 print("Warning: GROQ_API_KEY not found. Falling back to Ollama.")
-                self.llm = ChatOllama(
-                    model=LLM_MODEL,
-                    temperature=0.2,
-                    base_url=OLLAMA_HOST
-                )
+                self.llm = get_ollama_llm()
             else:
                 print(f"Using Groq LLM: {GROQ_MODEL}")
                 self.llm = ChatGroq(
@@ -399,58 +1579,76 @@ Answer:"""
                 )
         else:
             print(f"Using Ollama LLM: {LLM_MODEL}")
-            self.llm = ChatOllama(
-                model=LLM_MODEL,
-                temperature=0.2,
-                base_url=OLLAMA_HOST
-            )
+            self.llm = get_ollama_llm()
         self.vector_store_manager = VectorStoreManager(user_id=user_id)
-        self.indexed_files = self._get_indexed_files()
-    
-    def _get_indexed_files(self) -> List[str]:
-        """Fetch list of indexed filenames for the user."""
-        try:
-            from api.models import Document
-            docs = Document.objects.filter(user_id=self.user_id, index_status='indexed')
-            return [doc.original_filename for doc in docs]
-        except Exception:
-            return []
+        self.indexed_files = get_indexed_files(self.user_id)
 
+    @classmethod
+    def invalidate_prompt_cache(cls) -> None:
+        """Drop all compiled RAG prompts (e.g. after re-ingestion)."""
+        with cls._PROMPT_CACHE_LOCK:
+            cls._PROMPT_CACHE.clear()
+    
     def build_prompt(self, has_history: bool = False) -> ChatPromptTemplate:
-        """Build the prompt template with optional custom instructions and history support."""
+        """
+        Build the prompt template with optional custom instructions and history support.
+        Compiled templates are cached by (has_history, indexed files, custom prompt),
+        the only inputs that change the template text.
+        """
+        key = (has_history, tuple(self.indexed_files), self.custom_prompt)
+        with self._PROMPT_CACHE_LOCK:
+            prompt = self._PROMPT_CACHE.get(key)
+            if prompt is not None:
+                self._PROMPT_CACHE.move_to_end(key)
+                return prompt
+        
+        prompt = self._compile_prompt(has_history)
+        with self._PROMPT_CACHE_LOCK:
+            self._PROMPT_CACHE[key] = prompt
+            while len(self._PROMPT_CACHE) > PROMPT_CACHE_SIZE:
+                self._PROMPT_CACHE.popitem(last=False)
+        return prompt
+    
+    def _compile_prompt(self, has_history: bool) -> ChatPromptTemplate:
+        """Assemble and parse the RAG prompt (static system message + per-question user message)."""
         file_list_str = "\n".join([f"- {f}" for f in self.indexed_files]) if self.indexed_files else "No documents indexed."
+        file_list_str = _escape_braces(file_list_str)
         
         if self.custom_prompt and self.custom_prompt.strip():
             print(f"[DEBUG build_prompt] Using CUSTOM prompt")
-            # Build template using .format() to avoid f-string curly brace issues
-            template_parts = ["CRITICAL INSTRUCTION - YOU MUST FOLLOW THIS:"]
-            template_parts.append(self.custom_prompt.strip())
-            template_parts.append("")
-            
-            if has_history:
-                template_parts.append("{chat_history}")
-            
-            template_parts.append("Available Documents:")
-            template_parts.append(file_list_str)
-            template_parts.append("")
-            template_parts.append("Retrieved Context:")
-            template_parts.append("{context}")
-            template_parts.append("")
-            template_parts.append("User Question: {question}")
-            template_parts.append("")
-            template_parts.append("REMEMBER: " + self.custom_prompt.strip())
-            template_parts.append("")
-            template_parts.append("Answer:")
-            
-            template = "\n".join(template_parts)
+            custom = _escape_braces(self.custom_prompt.strip())
+            system = (
+                "CRITICAL INSTRUCTION - YOU MUST FOLLOW THIS:\n" + custom + "\n\n"
+                "You answer questions based ONLY on the provided Context and the list of Files in your collection."
+            )
+            user = "\n".join([
+                "Available Documents:",
+                file_list_str,
+                "",
+                "Retrieved Context:",
+                "{context}",
+                "",
+                "User Question: {question}",
+                "",
+                "REMEMBER: " + custom,
+                "",
+                "Answer:",
+            ])
         else:
             print(f"[DEBUG build_prompt] Using DEFAULT prompt")
-            template = self.DEFAULT_TEMPLATE.replace("{file_list}", file_list_str)
-            if has_history:
-                # Insert history before the question in the default template
-                template = template.replace("Question: {question}", "{chat_history}\nQuestion: {question}")
+            system = self.DEFAULT_SYSTEM_PROMPT
+            user = self.DEFAULT_USER_TEMPLATE.replace("{file_list}", file_list_str)
         
-        return ChatPromptTemplate.from_template(template)
+        return _chat_prompt(system, user, has_history)
+    
+    def _search_kwargs(self, k: int = 5) -> Dict[str, Any]:
+        """Vector search arguments shared by the retriever and the scored search in `query`."""
+        search_kwargs: Dict[str, Any] = {"k": k}
+        if self.user_id is not None:
+            # THIS IS THE KEY SECURITY FEATURE (Metadta Filtering)
+            # Only retrieve vectors where metadata['user_id'] == current_user
+            search_kwargs["filter"] = {"user_id": str(self.user_id)}
+        return search_kwargs
     
     def get_retriever(self, k: int = 5, use_hybrid: bool = True):
         """
@@ -466,26 +1664,18 @@ Answer:"""
         vector_store = self.vector_store_manager.load_vector_store()
         
         # Base vector retriever with user filtering
-        if self.user_id is not None:
-            # THIS IS THE KEY SECURITY FEATURE (Metadta Filtering)
-            # Only retrieve vectors where metadata['user_id'] == current_user
-            vector_retriever = vector_store.as_retriever(
-                search_kwargs={
-                    "k": k,
-                    "filter": {"user_id": str(self.user_id)}
-                }
-            )
-        else:
-            vector_retriever = vector_store.as_retriever(search_kwargs={"k": k})
+        vector_retriever = vector_store.as_retriever(search_kwargs=self._search_kwargs(k))
         
         # Use hybrid retriever if available and enabled
         if use_hybrid and HYBRID_SEARCH_ENABLED:
             try:
+                # Fusion draws from 2k candidates per side before keeping the top k
                 hybrid_retriever = create_hybrid_retriever(
-                    vector_retriever=vector_retriever,
+                    vector_retriever=vector_store.as_retriever(search_kwargs=self._search_kwargs(k * 2)),
                     user_id=self.user_id,
                     semantic_weight=0.6,
-                    bm25_weight=0.4
+                    bm25_weight=0.4,
+                    k=k
                 )
                 print(f"Using hybrid retriever (60% semantic, 40% BM25)")
                 return hybrid_retriever
@@ -495,22 +1685,48 @@ Answer:"""
         
         return vector_retriever
     
+    def _resolve_parents(self, docs: List) -> List:
+        """
+        Small-to-big: replace retrieved child chunks with their parent chunks.
+        Children of the same parent collapse into one entry (first hit wins the rank);
+        docs without a known parent (legacy index) are passed through unchanged.
+        """
+        parent_ids = list(dict.fromkeys(d.metadata['parent_id'] for d in docs if d.metadata.get('parent_id')))
+        if not parent_ids:
+            return docs
+        try:
+            parents = get_parent_store().get(parent_ids)
+        except Exception as e:
+            print(f"Parent lookup failed, using child chunks: {e}")
+            return docs
+        
+        resolved, seen = [], set()
+        for doc in docs:
+            parent_id = doc.metadata.get('parent_id')
+            if parent_id in parents:
+                if parent_id in seen:
+                    continue
+                seen.add(parent_id)
+                resolved.append(parents[parent_id])
+            else:
+                resolved.append(doc)
+        return resolved
+    
     def build_chain(self, chat_history: List = None):
         """Build the complete RAG chain with optional history."""
-        retriever = self.get_retriever()
+        retriever = self.get_retriever(k=RERANK_CANDIDATES if CROSS_ENCODER_AVAILABLE else 5)
+        context = (
+            RunnableLambda(lambda question: rerank_docs(question, retriever.invoke(question)))
+            | self._resolve_parents
+            | compress_docs
+        )
         has_history = chat_history is not None and len(chat_history) > 0
         prompt = self.build_prompt(has_history=has_history)
         
-        def format_docs(docs):
-            return "\n\n".join(
-                f"[Source: {doc.metadata.get('source', 'unknown')}]\n{doc.page_content}"
-                for doc in docs
-            )
-        
         if has_history:
             chain = (
                 {
-                    "context": retriever | format_docs,
+                    "context": context,
                     "question": RunnablePassthrough(),
                     "chat_history": lambda x: chat_history
                 }
@@ -520,7 +1736,7 @@ Answer:"""
             )
         else:
             chain = (
-                {"context": retriever | format_docs, "question": RunnablePassthrough()}
+                {"context": context, "question": RunnablePassthrough()}
                 | prompt
                 | self.llm
                 | StrOutputParser()
@@ -531,10 +1747,67 @@ Answer:"""
             "retriever": retriever
         }
     
-    def query(self, question: str, chat_history: List = None) -> Dict[str, Any]:
-        """Execute a RAG query and return response with citations."""
-        # Removed redundant build_chain call that was triggering extra retrievals/memory usage
-        # Get source documents with scores for confidence check
+    def _cached_answer(self, mode: str, question: str, chat_history: List = None):
+        """
+        Look the question up in the semantic answer cache.
+        Only first-turn questions are cached: with history the answer depends on the conversation.
+        
+        Returns:
+            (bucket, embedding, cached_result) - bucket is None when caching doesn't apply
+        """
+        if not SEMANTIC_CACHE_ENABLED or chat_history:
+            return None, None, None
+        # The document version comes from the shared DB, so an upload/delete handled by a
+        # Celery worker or another web process also retires answers cached in this process
+        version = get_documents_version(self.user_id)
+        if version is None:
+            return None, None, None
+        bucket = (self.user_id, mode, self.custom_prompt, tuple(self.indexed_files), version)
+        try:
+            # Same (LRU-cached) embedder the vector search uses, so the question is embedded once
+            embedding = self.vector_store_manager.embeddings.embed_query(question)
+        except Exception as e:
+            print(f"Semantic cache skipped: {e}")
+            return None, None, None
+        return bucket, embedding, _ANSWER_CACHE.lookup(bucket, question, embedding)
+    
+    @staticmethod
+    def _serve_cached(cached: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        """Turn a cached answer into a query result (as a one-chunk stream if requested)."""
+        result = {**cached, "citations": list(cached["citations"]),
+                  "steps": ["Found an answer to a similar question in cache..."]}
+        if stream:
+            result["response_stream"] = iter([result.pop("response")])
+            result["suggestions"] = []
+        return result
+    
+    def _remember_answer(self, bucket, question: str, embedding, result: Dict[str, Any]) -> None:
+        """Store a finished answer in the semantic cache."""
+        if bucket is None or not result.get("response"):
+            return
+        cached = {key: result[key] for key in ("response", "citations", "suggested_action", "suggestions") if key in result}
+        _ANSWER_CACHE.store(bucket, question, embedding, cached)
+    
+    def _remember_when_done(self, token_stream, bucket, question: str, embedding, result: Dict[str, Any]):
+        """Pass tokens through, then cache the full answer once the stream completes."""
+        parts = []
+        for token in token_stream:
+            parts.append(token)
+            yield token
+        self._remember_answer(bucket, question, embedding, {**result, "response": "".join(parts)})
+    
+    def query(self, question: str, chat_history: List = None, stream: bool = False) -> Dict[str, Any]:
+        """
+        Execute a RAG query and return response with citations.
+        With `stream=True` the answer is returned as a token generator under
+        `response_stream` (and follow-up suggestions are skipped).
+        """
+        bucket, embedding, cached = self._cached_answer("rag", question, chat_history)
+        if cached is not None:
+            return self._serve_cached(cached, stream)
+        
+        # Single retrieval pass: one query embedding + one vector search. The scored
+        # docs feed both the confidence check and the prompt context (no retriever chain).
         try:
             # We need the vector store directly to get scores
             vector_store = self.vector_store_manager.load_vector_store()
@@ -542,12 +1815,13 @@ Answer:"""
             if not vector_store:
                 raise ValueError("Vector store not initialized. No documents uploaded.")
 
-            # Using same k and filter as get_retriever
-            search_kwargs = {"k": 5}
-            if self.user_id:
-                search_kwargs["filter"] = {"user_id": str(self.user_id)}
-                
-            docs_with_scores = vector_store.similarity_search_with_score(question, **search_kwargs)
+            # With a reranker, fetch a wider candidate set and let it pick the final 5
+            k = RERANK_CANDIDATES if CROSS_ENCODER_AVAILABLE else RERANK_TOP_K
+            docs_with_scores = None
+            if self.vector_store_manager.quantization in ("binary", "int8"):
+                docs_with_scores = self.vector_store_manager.quantized_search_with_score(question, k=k)
+            if docs_with_scores is None:
+                docs_with_scores = vector_store.similarity_search_with_score(question, **self._search_kwargs(k=k))
             
             best_score = docs_with_scores[0][1] if docs_with_scores else float('inf')
             steps = ["Retrieving relevant documents..."]
@@ -569,14 +1843,15 @@ Answer:"""
                 steps.append(f"High relevance found (Score: {best_score:.2f})...")
                 steps.append("Synthesizing answer from documents...")
             
-            # Unpack docs for the chain
-            docs = [doc for doc, _ in docs_with_scores]
+            # Unpack docs for the chain (swapping matched children for their parents)
+            docs = self._resolve_parents(rerank_docs(question, [doc for doc, _ in docs_with_scores]))
             
         except Exception as e:
             print(f"⚠️ Retrieval note: {e}")
             docs = []
             steps = ["Notice: Using general knowledge (no documents matching your query)."]
             suggested_action = "web_search"
+            bucket = None  # Don't cache an answer produced without retrieval (may be a transient error)
         
         citations = []
         
@@ -590,114 +1865,117 @@ Answer:"""
                 "page": doc.metadata.get("page", None)
             })
         
-        # Generator answer using the chain (re-using build_chain logic logic but manually feeding docs)
-        # We need to re-construct the chain input manually since we bypassed the retriever
-        
-        rag_chain = self.build_chain(chat_history)["chain"]
-        
-        # We need to override the retriever in the chain OR just format docs manually
-        # Easier to use the prompts directly since we already have the docs
-        
-        context_str = "\n\n".join([f"[Source: {d.metadata.get('source', 'unknown')}]\n{d.page_content}" for d in docs])
-        
+        # Generate the answer from the docs we already retrieved (no second retrieval pass)
+        context_str = compress_docs(docs)
         has_history = chat_history is not None and len(chat_history) > 0
-        file_list_str = "\n".join([f"- {f}" for f in self.indexed_files]) if self.indexed_files else "No documents indexed."
-        
-        # Build template without f-strings to avoid curly brace issues
-        # SAFE FIX: We must NOT inject context_str directly into the template because
-        # it might contain curly braces (from code/JSON in documents) which breaks .from_template()
         
-        if self.custom_prompt and self.custom_prompt.strip():
-            template = "CRITICAL INSTRUCTION - YOU MUST FOLLOW THIS:\n" + self.custom_prompt.strip() + "\n\n"
-            template += "You answer questions based ONLY on the provided Context and the list of Files in your collection.\n\n"
-            template += "[FILES_IN_COLLECTION]:\n" + file_list_str + "\n\n"
-            template += "[CONTEXT]:\n{context}\n\n"
-            if has_history:
-                template += "{chat_history}\n"
-            template += "User Question: {question}\n\nREMEMBER: " + self.custom_prompt.strip() + "\n\nAnswer:"
-        else:
-            template = """You are KnowBot, a professional AI Knowledge Engine.
-You answer questions based ONLY on the provided Context and the list of Files in your collection.
-
-CRITICAL INSTRUCTION:
-- If asked "What files do I have?", refer ONLY to the [FILES_IN_COLLECTION] list below.
-- Do NOT list files mentioned INSIDE the text as files actually in the collection.
-
-[FILES_IN_COLLECTION]:
-""" + file_list_str + """
-
-[CONTEXT]:
-{context}
-
-""" + ("{chat_history}\n" if has_history else "") + """Question: {question}
-
-Answer:"""
-        
-        from langchain_core.prompts import ChatPromptTemplate
-        prompt = ChatPromptTemplate.from_template(template)
+        # Context is passed as a template variable, never injected into the template text,
+        # because documents may contain curly braces (code/JSON) that break .from_template()
+        prompt = self.build_prompt(has_history=has_history)
         chain = prompt | self.llm | StrOutputParser()
         
         input_data = {"question": question, "context": context_str}
         if has_history:
             input_data["chat_history"] = chat_history
-            
-        response = chain.invoke(input_data)
         
-
         if 'suggested_action' not in locals():
             suggested_action = None
+        
+        if stream:
+            result = {
+                "citations": citations,
+                "steps": steps,
+                "suggested_action": suggested_action,
+                "suggestions": []
+            }
+            result["response_stream"] = self._remember_when_done(
+                chain.stream(input_data), bucket, question, embedding, result
+            )
+            return result
+        
+        response = "".join(chain.stream(input_data))
 
-        return {
+        result = {
             "response": response,
             "citations": citations,
             "steps": steps,
             "suggested_action": suggested_action,
             "suggestions": self.generate_suggestions(response, question)
         }
+        self._remember_answer(bucket, question, embedding, result)
+        return result
 
-    def general_query(self, question: str, chat_history: List = None) -> Dict[str, Any]:
+    def general_query(self, question: str, chat_history: List = None, stream: bool = False) -> Dict[str, Any]:
         """Execute a general LLM query without RAG context."""
+        bucket, embedding, cached = self._cached_answer("general", question, chat_history)
+        if cached is not None:
+            return self._serve_cached(cached, stream)
+        
         thinking_steps = ["Analyzing request...", "Checking knowledge base...", "No documents found, using general knowledge..."]
         
         has_history = chat_history is not None and len(chat_history) > 0
         
         # Use custom prompt if available, otherwise use default
         if self.custom_prompt and self.custom_prompt.strip():
-            template = "CRITICAL INSTRUCTION - YOU MUST FOLLOW THIS:\n" + self.custom_prompt.strip() + "\n\n"
-            if has_history:
-                template += "{chat_history}\n"
-            template += "User Question: {question}\n\nREMEMBER: " + self.custom_prompt.strip() + "\n\nAnswer:"
+            custom = _escape_braces(self.custom_prompt.strip())
+            prompt = _chat_prompt(
+                "CRITICAL INSTRUCTION - YOU MUST FOLLOW THIS:\n" + custom,
+                "User Question: {question}\n\nREMEMBER: " + custom + "\n\nAnswer:",
+                has_history
+            )
         else:
-            template = "You are KnowBot, a helpful AI assistant.\n        \n"
-            if has_history:
-                template += "{chat_history}\n"
-            template += "Question: {question}\n\nAnswer:"
+            prompt = self._GENERAL_PROMPTS[has_history]
         
-        prompt = ChatPromptTemplate.from_template(template)
         chain = prompt | self.llm | StrOutputParser()
         
         input_data = {"question": question}
         if has_history:
             input_data["chat_history"] = chat_history
-            
-        response = chain.invoke(input_data)
         
+        if stream:
+            result = {
+                "citations": [],
+                "steps": thinking_steps,
+                "suggested_action": "web_search"
+            }
+            result["response_stream"] = self._remember_when_done(
+                chain.stream(input_data), bucket, question, embedding, result
+            )
+            return result
+        
+        response = "".join(chain.stream(input_data))
 
-        return {
+        result = {
             "response": response,
             "citations": [],
             "steps": thinking_steps,
             "suggested_action": "web_search"
         }
+        self._remember_answer(bucket, question, embedding, result)
+        return result
 
-    def web_search_query(self, question: str, chat_history: List = None) -> Dict[str, Any]:
+    def general_query_stream(self, question: str, chat_history: List = None) -> Iterator[Dict[str, Any]]:
+        """
+        Generator form of `general_query(stream=True)` for callers without their own framing:
+        one `token` event per LLM chunk, then a final `done` event carrying citations/steps.
+        """
+        result = self.general_query(question, chat_history, stream=True)
+        for token in result.pop("response_stream"):
+            yield {"type": "token", "content": token}
+        yield {"type": "done", **result}
+
+    async def web_search_async(self, question: str, chat_history: List = None) -> Dict[str, Any]:
+        """
+        `web_search_query` for async callers: runs in a worker thread so the event
+        loop is never blocked on Tavily or the LLM.
+        """
+        return await asyncio.to_thread(self.web_search_query, question, chat_history)
+    
+    def web_search_query(self, question: str, chat_history: List = None, stream: bool = False) -> Dict[str, Any]:
         """Execute a WEB SEARCH query using Tavily API."""
-        import os
-        from tavily import TavilyClient
-        
         tavily_key = os.environ.get("TAVILY_API_KEY")
-        if not tavily_key:
-            return self.general_query(question, chat_history)
+        if not tavily_key or not TAVILY_AVAILABLE:
+            return self.general_query(question, chat_history, stream=stream)
 
         thinking_steps = ["Analyzing request..."]
         
@@ -706,13 +1984,7 @@ Answer:"""
         if chat_history and len(chat_history) > 0:
             thinking_steps.append("Contextualizing search query...")
             try:
-                reform_template = """Given the following conversation history and a follow-up question, rephrase the follow-up question to be a standalone search query.
-Chat History:
-{chat_history}
-Follow Up Input: {question}
-Standalone Question:"""
-                reform_prompt = ChatPromptTemplate.from_template(reform_template)
-                reform_chain = reform_prompt | self.llm | StrOutputParser()
+                reform_chain = self._REFORM_PROMPT | self.llm | StrOutputParser()
                 # We need to serialize history to string for this specific prompt
                 history_str = "\n".join([f"{msg.type}: {msg.content}" for msg in chat_history])
                 
@@ -725,9 +1997,7 @@ Standalone Question:"""
         thinking_steps.append("Searching the web...")
         
         try:
-            tavily = TavilyClient(api_key=tavily_key)
-            # Use 'basic' search depth to save memory in hosted environments
-            search_result = tavily.search(query=search_query, search_depth="basic")
+            search_result = search_web(tavily_key, search_query)
             thinking_steps.append("Reading search results...")
             
             # Format context from web results
@@ -743,37 +2013,43 @@ Standalone Question:"""
             
             # Use custom prompt if available, otherwise use default
             if self.custom_prompt and self.custom_prompt.strip():
-                template = "CRITICAL INSTRUCTION - YOU MUST FOLLOW THIS:\n" + self.custom_prompt.strip() + "\n\n"
-                template += "Use the following search results to answer the user's question.\n"
-                template += "Always cite your sources using the URLs provided.\n\n"
-                template += "Web Search Results:\n" + web_context + "\n\n"
-                if has_history:
-                    template += "{chat_history}\n"
-                template += "User Question: {question}\n\nREMEMBER: " + self.custom_prompt.strip() + "\n\nAnswer:"
+                custom = _escape_braces(self.custom_prompt.strip())
+                prompt = _chat_prompt(
+                    "CRITICAL INSTRUCTION - YOU MUST FOLLOW THIS:\n" + custom + "\n\n"
+                    "Use the search results provided with each question to answer it.\n"
+                    "Always cite your sources using the URLs provided.",
+                    "Web Search Results:\n{web_context}\n\n"
+                    "User Question: {question}\n\nREMEMBER: " + custom + "\n\nAnswer:",
+                    has_history
+                )
             else:
-                template = "You are KnowBot, a helpful AI assistant with live web access.\n            \n"
-                template += "Use the following search results to answer the user's question accurately.\n"
-                template += "Always cite your sources using the URLs provided.\n\n"
-                template += "Web Search Results:\n" + web_context + "\n\n"
-                if has_history:
-                    template += "{chat_history}\n"
-                template += "Question: {question}\n\nAnswer:"
+                prompt = self._WEB_PROMPTS[has_history]
             
-            prompt = ChatPromptTemplate.from_template(template)
             chain = prompt | self.llm | StrOutputParser()
             
-            input_data = {"question": question}
+            # Results go in as a variable, so braces in page content can't break the template
+            input_data = {"question": question, "web_context": web_context}
             if has_history:
                 input_data["chat_history"] = chat_history
+            
+            citations = [{"source": res['url'], "content": res['content']} for res in search_result.get('results', [])[:3]]
+            
+            if stream:
+                return {
+                    "response_stream": chain.stream(input_data),
+                    "citations": citations,
+                    "steps": thinking_steps,
+                    "suggestions": []
+                }
                 
-            response = chain.invoke(input_data)
+            response = "".join(chain.stream(input_data))
             
             # Generate follow-up suggestions
             suggestions = self.generate_suggestions(response, question)
             
             return {
                 "response": response,
-                "citations": [{"source": res['url'], "content": res['content']} for res in search_result.get('results', [])[:3]],
+                "citations": citations,
                 "steps": thinking_steps,
                 "suggestions": suggestions
             }
@@ -781,7 +2057,7 @@ Standalone Question:"""
         except Exception as e:
             print(f"Web search failed: {e}")
             thinking_steps.append("Web search failed, falling back to internal knowledge.")
-            return self.general_query(question, chat_history)
+            return self.general_query(question, chat_history, stream=stream)
 
     def generate_suggestions(self, last_response: str, last_question: str) -> List[str]:
         """Generate EXACTLY 3 relevant follow-up questions based on the last interaction."""
@@ -870,7 +2146,29 @@ def get_vector_store(chunks: List = None, user_id: int = None) -> Chroma:
     return manager.get_or_create_vector_store(chunks)
 
 
+# Built chains keyed by (user_id, custom prompt hash, indexed files). The file list is
+# part of the key because it is baked into the prompt and the BM25 retriever.
+_CHAINS: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_CHAINS_LOCK = threading.Lock()
+
+
 def build_rag_chain(custom_prompt: Optional[str] = None, user_id: int = None) -> Dict[str, Any]:
-    """Build RAG chain with optional custom prompt."""
+    """
+    Build RAG chain with optional custom prompt.
+    Chains are reused across calls until the user's indexed files change.
+    """
+    prompt_hash = hashlib.blake2b((custom_prompt or "").encode('utf-8'), digest_size=16).hexdigest()
+    key = (user_id, prompt_hash, tuple(get_indexed_files(user_id)))
+    with _CHAINS_LOCK:
+        chain = _CHAINS.get(key)
+        if chain is not None:
+            _CHAINS.move_to_end(key)
+            return chain
+    
     engine = RAGEngine(custom_prompt=custom_prompt, user_id=user_id)
-    return engine.build_chain()
+    chain = engine.build_chain()
+    with _CHAINS_LOCK:
+        _CHAINS[key] = chain
+        while len(_CHAINS) > CHAIN_CACHE_SIZE:
+            _CHAINS.popitem(last=False)
+    return chain
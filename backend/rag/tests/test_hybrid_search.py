@@ -0,0 +1,119 @@
+"""
+Tests for the BM25 side of hybrid search.
+
+These import the RAG modules directly, so they run without Django settings.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.hybrid_search import BM25_AVAILABLE, BM25Index, HybridRetriever
+
+
+def _doc(text: str, file_path: str) -> Document:
+    return Document(page_content=text, metadata={'file_path': file_path})
+
+
+DOCS = [
+    _doc("Invoice 1042 from Acme Corp, due in thirty days", "/docs/invoice.pdf"),
+    _doc("Acme Corp quarterly revenue grew eight percent", "/docs/report.pdf"),
+    _doc("The quarterly report covers revenue and churn", "/docs/report.pdf"),
+    _doc("Churn fell after the pricing change in March", "/docs/notes.txt"),
+    _doc("Meeting notes: pricing, invoices, and renewals", "/docs/notes.txt"),
+]
+QUERIES = ["acme revenue", "quarterly churn", "invoice pricing", "march renewals"]
+
+
+@unittest.skipUnless(BM25_AVAILABLE, "rank_bm25 not installed")
+class BM25IndexTests(unittest.TestCase):
+
+    def assertSameScores(self, index: BM25Index, expected: BM25Index) -> None:
+        self.assertEqual(len(index.documents), len(expected.documents))
+        self.assertAlmostEqual(index.bm25.avgdl, expected.bm25.avgdl)
+        for query in QUERIES:
+            np.testing.assert_allclose(
+                [score for _, score in index.search(query, k=len(DOCS))],
+                [score for _, score in expected.search(query, k=len(DOCS))],
+            )
+
+    def test_incremental_add_matches_rebuild(self):
+        index = BM25Index(DOCS[:2])
+        index.add_documents(DOCS[2:])
+        self.assertSameScores(index, BM25Index(DOCS))
+
+    def test_remove_file_matches_rebuild(self):
+        index = BM25Index(DOCS)
+        self.assertTrue(index.remove_file("/docs/report.pdf"))
+        self.assertNotIn("/docs/report.pdf", [d.metadata['file_path'] for d in index.documents])
+        self.assertSameScores(index, BM25Index([d for d in DOCS if d.metadata['file_path'] != "/docs/report.pdf"]))
+
+    def test_remove_unknown_file_is_a_no_op(self):
+        index = BM25Index(DOCS)
+        self.assertFalse(index.remove_file("/docs/missing.pdf"))
+        self.assertEqual(len(index.documents), len(DOCS))
+
+    def test_remove_last_file_clears_index(self):
+        index = BM25Index(DOCS[:1])
+        self.assertTrue(index.remove_file("/docs/invoice.pdf"))
+        self.assertIsNone(index.bm25)
+        self.assertEqual(index.search("invoice"), [])
+
+    def test_delete_then_recreate_does_not_duplicate(self):
+        index = BM25Index(DOCS)
+        index.remove_file("/docs/notes.txt")
+        index.add_documents([d for d in DOCS if d.metadata['file_path'] == "/docs/notes.txt"])
+        self.assertEqual(len(index.documents), len(DOCS))
+
+    def test_save_load_round_trip(self):
+        index = BM25Index(DOCS)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bm25.pkl"
+            index.save(path)
+            self.assertSameScores(BM25Index.load(path), index)
+
+
+class _ListRetriever:
+    """Stands in for a vector store retriever: returns its documents in order."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def invoke(self, query):
+        return list(self.documents)
+
+
+@unittest.skipUnless(BM25_AVAILABLE, "rank_bm25 not installed")
+class HybridRetrieverTests(unittest.TestCase):
+
+    def setUp(self):
+        self.documents = [_doc(f"chunk {i} about acme revenue", f"/docs/{i}.pdf") for i in range(40)]
+
+    def _retriever(self, **kwargs) -> HybridRetriever:
+        return HybridRetriever(
+            vector_retriever=_ListRetriever(self.documents),
+            bm25_index=BM25Index(self.documents),
+            **kwargs
+        )
+
+    def test_default_returns_five(self):
+        self.assertEqual(len(self._retriever().invoke("acme revenue")), 5)
+
+    def test_k_sets_candidate_count_for_reranking(self):
+        # build_chain asks for RERANK_CANDIDATES (30) so the cross-encoder sees more than 5
+        self.assertEqual(len(self._retriever(k=30).invoke("acme revenue")), 30)
+
+    def test_semantic_fallback_respects_k(self):
+        retriever = HybridRetriever(
+            vector_retriever=_ListRetriever(self.documents),
+            bm25_index=BM25Index(),
+            k=12
+        )
+        self.assertEqual(len(retriever.invoke("acme revenue")), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the binary + int8 quantized vector index.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from rag.quantized_index import (
+    MIN_CALIBRATION_VECTORS, QuantizedIndex, get_quantized_index,
+    update_quantized_index, remove_from_quantized_index, delete_quantized_index,
+)
+
+DIM = 64
+
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _filled(count: int) -> QuantizedIndex:
+    """Index of `count` vectors, ids "c<i>", split across two files by parity."""
+    index = QuantizedIndex()
+    index.add(
+        [f"c{i}" for i in range(count)],
+        ["/docs/even.pdf" if i % 2 == 0 else "/docs/odd.pdf" for i in range(count)],
+        _vectors(count).tolist(),
+    )
+    return index
+
+
+class QuantizedIndexTests(unittest.TestCase):
+
+    def test_uncalibrated_index_searches_float32(self):
+        index = _filled(10)
+        self.assertIsNone(index.mean)
+        self.assertEqual(index.search(_vectors(10)[3], k=1), ["c3"])
+        self.assertEqual(index.search_int8(_vectors(10)[7], k=1), ["c7"])
+
+    def test_calibrates_once_enough_vectors_arrive(self):
+        index = _filled(MIN_CALIBRATION_VECTORS - 1)
+        self.assertIsNone(index.mean)
+        index.add(["extra"], ["/docs/extra.pdf"], _vectors(1, seed=1).tolist())
+        self.assertIsNotNone(index.mean)
+        self.assertEqual(index.raw.size, 0)
+        self.assertEqual(index.codes.shape, (MIN_CALIBRATION_VECTORS, DIM))
+        self.assertEqual(index.bits.shape, (MIN_CALIBRATION_VECTORS, DIM // 8))
+
+    def test_calibrated_search_finds_each_vector(self):
+        count = MIN_CALIBRATION_VECTORS + 44
+        index = _filled(count)
+        vectors = _vectors(count)
+        for i in range(0, count, 25):
+            self.assertEqual(index.search(vectors[i], k=1), [f"c{i}"])
+            self.assertEqual(index.search_int8(vectors[i], k=1), [f"c{i}"])
+
+    def test_remove_file(self):
+        for count in (10, MIN_CALIBRATION_VECTORS + 10):
+            index = _filled(count)
+            index.remove_file("/docs/odd.pdf")
+            self.assertEqual(len(index), (count + 1) // 2)
+            self.assertTrue(all(fp == "/docs/even.pdf" for fp in index.file_paths))
+            self.assertEqual(index.search(_vectors(count)[4], k=1), ["c4"])
+            self.assertNotIn("c5", index.search(_vectors(count)[5], k=len(index)))
+
+    def test_save_load_round_trip(self):
+        for count in (10, MIN_CALIBRATION_VECTORS + 10):
+            index = _filled(count)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "index.npz"
+                index.save(path)
+                loaded = QuantizedIndex.load(path)
+            self.assertEqual(loaded.ids, index.ids)
+            self.assertEqual(loaded.search(_vectors(count)[6], k=3), index.search(_vectors(count)[6], k=3))
+
+
+class QuantizedIndexFileTests(unittest.TestCase):
+
+    def test_update_remove_delete(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "user_1.npz"
+            vectors = _vectors(4)
+            update_quantized_index(path, ["a", "b"], ["/docs/a.pdf", "/docs/b.pdf"], vectors[:2].tolist())
+            update_quantized_index(path, ["c", "d"], ["/docs/a.pdf", "/docs/b.pdf"], vectors[2:].tolist())
+            self.assertEqual(QuantizedIndex.load(path).ids, ["a", "b", "c", "d"])
+
+            remove_from_quantized_index(path, "/docs/a.pdf")
+            self.assertEqual(get_quantized_index(path).ids, ["b", "d"])
+
+            delete_quantized_index(path)
+            self.assertFalse(path.exists())
+            self.assertEqual(len(get_quantized_index(path)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests for the semantic answer cache (similarity threshold, entity guard, TTL, LRU).
+"""
+
+import unittest
+from unittest import mock
+
+from rag.semantic_cache import SemanticAnswerCache, extract_entities
+
+BUCKET = (1, 'chat', '', 'v1')
+
+
+class ExtractEntitiesTests(unittest.TestCase):
+
+    def test_capitalized_terms_and_numbers(self):
+        self.assertEqual(extract_entities("What was our CPC for Acme in 2023?"), {"CPC", "Acme", "2023"})
+
+    def test_sentence_initial_words_are_not_entities(self):
+        self.assertEqual(extract_entities("How do refunds work? What is the policy?"), frozenset())
+
+
+class SemanticAnswerCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=2)
+
+    def test_similar_question_hits(self):
+        self.cache.store(BUCKET, "how do refunds work?", [1.0, 0.0, 0.0], {'answer': 'A'})
+        self.assertEqual(self.cache.lookup(BUCKET, "how are refunds handled?", [0.99, 0.1, 0.0]), {'answer': 'A'})
+
+    def test_dissimilar_question_misses(self):
+        self.cache.store(BUCKET, "how do refunds work?", [1.0, 0.0, 0.0], {'answer': 'A'})
+        self.assertIsNone(self.cache.lookup(BUCKET, "who is the CEO?", [0.0, 1.0, 0.0]))
+
+    def test_other_bucket_misses(self):
+        self.cache.store(BUCKET, "how do refunds work?", [1.0, 0.0, 0.0], {'answer': 'A'})
+        self.assertIsNone(self.cache.lookup((2, 'chat', '', 'v1'), "how do refunds work?", [1.0, 0.0, 0.0]))
+
+    def test_entity_guard_rejects_different_key_term(self):
+        self.cache.store(BUCKET, "what was our CPC last month?", [1.0, 0.0, 0.0], {'answer': 'CPC'})
+        self.assertIsNone(self.cache.lookup(BUCKET, "what was our CPM last month?", [1.0, 0.0, 0.0]))
+        self.assertEqual(self.cache.lookup(BUCKET, "what was the CPC last month?", [1.0, 0.0, 0.0]), {'answer': 'CPC'})
+
+    def test_expired_answer_misses(self):
+        with mock.patch('rag.semantic_cache.time.time', return_value=1000.0):
+            self.cache.store(BUCKET, "how do refunds work?", [1.0, 0.0, 0.0], {'answer': 'A'})
+        with mock.patch('rag.semantic_cache.time.time', return_value=1030.0):
+            self.assertIsNotNone(self.cache.lookup(BUCKET, "how do refunds work?", [1.0, 0.0, 0.0]))
+        with mock.patch('rag.semantic_cache.time.time', return_value=1061.0):
+            self.assertIsNone(self.cache.lookup(BUCKET, "how do refunds work?", [1.0, 0.0, 0.0]))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.store(BUCKET, "q one", [1.0, 0.0, 0.0], {'answer': 1})
+        self.cache.store(BUCKET, "q two", [0.0, 1.0, 0.0], {'answer': 2})
+        self.cache.lookup(BUCKET, "q one", [1.0, 0.0, 0.0])  # "q two" is now least recently used
+        self.cache.store(BUCKET, "q three", [0.0, 0.0, 1.0], {'answer': 3})
+        self.assertEqual(self.cache.lookup(BUCKET, "q one", [1.0, 0.0, 0.0]), {'answer': 1})
+        self.assertIsNone(self.cache.lookup(BUCKET, "q two", [0.0, 1.0, 0.0]))
+        self.assertEqual(self.cache.lookup(BUCKET, "q three", [0.0, 0.0, 1.0]), {'answer': 3})
+
+    def test_restoring_a_question_replaces_its_answer(self):
+        self.cache.store(BUCKET, "q one", [1.0, 0.0, 0.0], {'answer': 'old'})
+        self.cache.store(BUCKET, "q one", [1.0, 0.0, 0.0], {'answer': 'new'})
+        self.cache.store(BUCKET, "q two", [0.0, 1.0, 0.0], {'answer': 2})
+        self.assertEqual(self.cache.lookup(BUCKET, "q one", [1.0, 0.0, 0.0]), {'answer': 'new'})
+        self.assertEqual(self.cache.lookup(BUCKET, "q two", [0.0, 1.0, 0.0]), {'answer': 2})
+
+    def test_clear_user(self):
+        other = (2, 'chat', '', 'v1')
+        self.cache.store(BUCKET, "q one", [1.0, 0.0, 0.0], {'answer': 1})
+        self.cache.store(other, "q one", [1.0, 0.0, 0.0], {'answer': 2})
+        self.cache.clear(1)
+        self.assertIsNone(self.cache.lookup(BUCKET, "q one", [1.0, 0.0, 0.0]))
+        self.assertEqual(self.cache.lookup(other, "q one", [1.0, 0.0, 0.0]), {'answer': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
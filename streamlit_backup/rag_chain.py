@@ -1,11 +1,13 @@
 from langchain_ollama import OllamaEmbeddings, ChatOllama
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, DirectoryLoader
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import os
 
 # ------------------ Configuration ------------------
 CHUNK_SIZE = 800
@@ -15,21 +17,28 @@ LLM_MODEL = "llama3.1:8b"
 PERSIST_DIRECTORY = "./chroma_db"
 
 # ------------------ Document Loading & Chunking ------------------
+LOADERS = {".pdf": PyPDFLoader, ".txt": TextLoader, ".md": TextLoader}
+
+# Built once per process. Nothing here reads chunk offsets, so start_index isn't computed.
+TEXT_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+    add_start_index=False,
+)
+
+def _load_one(path):
+    """Load and split a single file (runs in a worker process, returns ready chunks)."""
+    documents = LOADERS[Path(path).suffix.lower()](str(path)).load()
+    return TEXT_SPLITTER.split_documents(documents)
+
 def load_and_chunk_documents(directory="./data"):
-    pdf_loader = DirectoryLoader(directory, glob="**/*.pdf", loader_cls=PyPDFLoader)
-    txt_loader = DirectoryLoader(directory, glob="**/*.txt", loader_cls=TextLoader)
-    md_loader = DirectoryLoader(directory, glob="**/*.md", loader_cls=TextLoader)
+    # PDF parsing is CPU-bound and independent per file: one process per core
+    paths = [p for p in sorted(Path(directory).rglob("*")) if p.suffix.lower() in LOADERS]
     
-    documents = pdf_loader.load() + txt_loader.load() + md_loader.load()
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        add_start_index=True,
-    )
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        chunks = [chunk for file_chunks in executor.map(_load_one, paths) for chunk in file_chunks]
     
-    chunks = text_splitter.split_documents(documents)
     print(f"Loaded and chunked {len(chunks)} pieces from documents.")
     return chunks
 